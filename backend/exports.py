@@ -0,0 +1,268 @@
+"""Incremental Parquet/Arrow exports of leads and payment transactions for analytics.
+
+Each run streams the documents written since the previous run's watermark, in
+(watermark field, id) order, into one columnar file per run under EXPORT_DIR:
+
+    python exports.py run leads --format parquet
+    python exports.py run transactions --format arrow
+    python exports.py status
+
+Transactions are keyed on updated_at, so a transaction whose status changed is
+exported again; readers keep the row with the latest updated_at per id.
+"""
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+ROOT_DIR = Path(__file__).parent
+EXPORT_DIR = Path(os.environ.get('EXPORT_DIR', str(ROOT_DIR / 'exports')))
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '5000'))
+# Writes stamped within this window may still be in flight, so the watermark stays behind it
+EXPORT_SETTLE_SECONDS = float(os.environ.get('EXPORT_SETTLE_SECONDS', '60'))
+EXPORT_LEASE_SECONDS = float(os.environ.get('EXPORT_LEASE_SECONDS', '900'))
+EXPORT_FORMATS = ("parquet", "arrow")
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ExportDataset:
+    name: str
+    collection: str
+    watermark_field: str
+    schema: pa.Schema
+    json_fields: tuple = ()
+
+EXPORT_DATASETS = {
+    "leads": ExportDataset(
+        name="leads",
+        collection="leads",
+        watermark_field="created_at",
+        schema=pa.schema([
+            ("id", pa.string()),
+            ("email", pa.string()),
+            ("name", pa.string()),
+            ("phone", pa.string()),
+            ("source", pa.string()),
+            ("coupon_code", pa.string()),
+            ("discount", pa.string()),
+            ("used", pa.bool_()),
+            ("created_at", TIMESTAMP),
+            ("expires_at", TIMESTAMP),
+        ])
+    ),
+    "transactions": ExportDataset(
+        name="transactions",
+        collection="payment_transactions",
+        watermark_field="updated_at",
+        schema=pa.schema([
+            ("id", pa.string()),
+            ("session_id", pa.string()),
+            ("service_package", pa.string()),
+            ("amount", pa.float64()),
+            ("currency", pa.string()),
+            ("customer_email", pa.string()),
+            ("customer_name", pa.string()),
+            ("payment_status", pa.string()),
+            ("metadata", pa.string()),
+            ("created_at", TIMESTAMP),
+            ("updated_at", TIMESTAMP),
+        ]),
+        json_fields=("metadata",)
+    ),
+}
+
+class ExportInProgressError(Exception):
+    pass
+
+class ChunkWriter:
+    """Appends record batches to a Parquet file (one row group per chunk) or an Arrow IPC file"""
+
+    def __init__(self, path: Path, schema: pa.Schema, format: str):
+        self.path = path
+        if format == "parquet":
+            self._writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+        else:
+            self._writer = ipc.new_file(str(path), schema)
+
+    def write(self, table: pa.Table):
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+def to_table(dataset: ExportDataset, docs: List[Dict[str, Any]]) -> pa.Table:
+    columns = dataset.schema.names
+    rows = []
+    for doc in docs:
+        row = {column: doc.get(column) for column in columns}
+        for field in dataset.json_fields:
+            if row[field] is not None:
+                row[field] = orjson.dumps(row[field], option=orjson.OPT_NAIVE_UTC).decode()
+        rows.append(row)
+    return pa.Table.from_pylist(rows, schema=dataset.schema)
+
+def _as_utc(value: datetime) -> datetime:
+    # mongomock and clients without tz_aware return naive UTC datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+async def acquire_lease(db, dataset: ExportDataset) -> Dict[str, Any]:
+    """Claim the dataset's watermark document so concurrent runs (CLI or API, any worker) cannot interleave"""
+    now = datetime.now(timezone.utc)
+    try:
+        state = await db.export_watermarks.find_one_and_update(
+            {"_id": dataset.name, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=EXPORT_LEASE_SECONDS), "lease_owner": socket.gethostname()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise ExportInProgressError(f"An export of {dataset.name} is already running")
+    return state
+
+async def release_lease(db, dataset: ExportDataset, update: Optional[Dict[str, Any]] = None):
+    await db.export_watermarks.update_one(
+        {"_id": dataset.name},
+        {"$set": {**(update or {}), "lease_until": None}}
+    )
+
+async def run_export(db, dataset_name: str, format: str = "parquet", chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Export everything past the stored watermark and advance it; returns a run summary"""
+    dataset = EXPORT_DATASETS[dataset_name]
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    state = await acquire_lease(db, dataset)
+    field = dataset.watermark_field
+    started_at = datetime.now(timezone.utc)
+    upper_bound = started_at - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    watermark_value = state.get("value")
+    watermark_id = state.get("id") or ""
+
+    output_dir = EXPORT_DIR / dataset.name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = "parquet" if format == "parquet" else "arrow"
+    final_path = output_dir / f"{dataset.name}-{started_at.strftime('%Y%m%dT%H%M%S%fZ')}.{suffix}"
+    temp_path = final_path.with_name(final_path.name + ".tmp")
+
+    writer: Optional[ChunkWriter] = None
+    rows = 0
+    try:
+        while True:
+            # Keyset scan over (field, id): resumes exactly after the last exported document
+            query: Dict[str, Any] = {field: {"$lt": upper_bound}}
+            if watermark_value is not None:
+                query["$or"] = [
+                    {field: {"$gt": watermark_value}},
+                    {field: watermark_value, "id": {"$gt": watermark_id}},
+                ]
+            docs = await db[dataset.collection].find(query, {"_id": 0}).sort(
+                [(field, ASCENDING), ("id", ASCENDING)]
+            ).limit(chunk_size).to_list(chunk_size)
+            if not docs:
+                break
+
+            table = to_table(dataset, docs)
+            if writer is None:
+                writer = ChunkWriter(temp_path, dataset.schema, format)
+            await asyncio.to_thread(writer.write, table)
+            rows += len(docs)
+            watermark_value = _as_utc(docs[-1][field])
+            watermark_id = docs[-1]["id"]
+            if len(docs) < chunk_size:
+                break
+
+        files = []
+        if writer is not None:
+            writer.close()
+            writer = None
+            temp_path.rename(final_path)
+            files.append(str(final_path))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        temp_path.unlink(missing_ok=True)
+        await release_lease(db, dataset)
+        raise
+
+    # The watermark only moves once the file is in place; a crash before this re-exports the same rows
+    summary = {
+        "dataset": dataset.name,
+        "format": format,
+        "rows": rows,
+        "files": files,
+        "watermark": {"field": field, "value": watermark_value.isoformat() if watermark_value else None, "id": watermark_id},
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat()
+    }
+    await release_lease(db, dataset, {
+        "field": field,
+        "value": watermark_value,
+        "id": watermark_id,
+        "last_run": summary
+    })
+    logger.info(f"Exported {rows} {dataset.name} rows to {files[0] if files else 'no file'}")
+    return summary
+
+async def export_status(db) -> List[Dict[str, Any]]:
+    states = {state["_id"]: state for state in await db.export_watermarks.find().to_list(len(EXPORT_DATASETS))}
+    status = []
+    for name, dataset in EXPORT_DATASETS.items():
+        state = states.get(name, {})
+        status.append({
+            "dataset": name,
+            "watermark_field": dataset.watermark_field,
+            "watermark": state.get("value"),
+            "running": bool(state.get("lease_until")) and _as_utc(state["lease_until"]) > datetime.now(timezone.utc),
+            "last_run": state.get("last_run")
+        })
+    return status
+
+
+if __name__ == "__main__":
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(ROOT_DIR / '.env')
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    cli = typer.Typer(help="Incremental columnar exports for analytics")
+
+    def _database():
+        return AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)[os.environ['DB_NAME']]
+
+    @cli.command()
+    def run(
+        dataset: str = typer.Argument(..., help="leads or transactions"),
+        format: str = typer.Option("parquet", help="parquet or arrow"),
+        chunk_size: int = typer.Option(EXPORT_CHUNK_SIZE, help="documents per row group")
+    ):
+        """Export rows written since the last run"""
+        if dataset not in EXPORT_DATASETS:
+            raise typer.BadParameter(f"choose one of {', '.join(EXPORT_DATASETS)}")
+        summary = asyncio.run(run_export(_database(), dataset, format, chunk_size))
+        typer.echo(orjson.dumps(summary, option=orjson.OPT_INDENT_2).decode())
+
+    @cli.command()
+    def status():
+        """Show each dataset's watermark and last run"""
+        typer.echo(orjson.dumps(asyncio.run(export_status(_database())), option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC).decode())
+
+    cli()
@@ -0,0 +1,111 @@
+"""Production entry point for the API.
+
+    python launcher.py
+
+Settings come from the environment (backend/.env is read too):
+
+    HOST, PORT                      bind address (default 0.0.0.0:8001)
+    WEB_CONCURRENCY                 worker processes (default: CPUs available to the container, at most 4)
+    UVICORN_LOOP                    auto, uvloop or asyncio (default auto)
+    UVICORN_HTTP                    auto, httptools or h11 (default auto)
+    UVICORN_KEEPALIVE_TIMEOUT       idle keep-alive seconds (default 5)
+    UVICORN_BACKLOG                 listen backlog (default 2048)
+    FORWARDED_ALLOW_IPS             proxies trusted for X-Forwarded-* (default 127.0.0.1); the rate
+                                    limiter keys clients on the address uvicorn takes from them
+    LOG_LEVEL                       uvicorn log level (default info)
+
+Each worker creates its own Motor client in the app's startup hook; pool sizes and
+timeouts are read there from the MONGO_* variables (see MONGO_CLIENT_OPTIONS in server.py).
+"""
+import importlib.util
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Each worker holds its own Mongo pool, coupon pool and background pollers, so the default stays small
+DEFAULT_MAX_WORKERS = 4
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def select_loop() -> str:
+    loop = os.environ.get('UVICORN_LOOP', 'auto')
+    if loop == 'uvloop' and not _installed('uvloop'):
+        raise RuntimeError("UVICORN_LOOP=uvloop but uvloop is not installed")
+    if loop == 'auto':
+        return 'uvloop' if _installed('uvloop') else 'asyncio'
+    return loop
+
+def select_http() -> str:
+    http = os.environ.get('UVICORN_HTTP', 'auto')
+    if http == 'httptools' and not _installed('httptools'):
+        raise RuntimeError("UVICORN_HTTP=httptools but httptools is not installed")
+    if http == 'auto':
+        return 'httptools' if _installed('httptools') else 'h11'
+    return http
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of this container (cgroup v2, then v1); None when unlimited or not in a cgroup"""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def default_workers() -> int:
+    # os.cpu_count() reports the host's cores inside a container; the affinity mask and quota do not
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, min(cpus, DEFAULT_MAX_WORKERS))
+
+def uvicorn_options() -> dict:
+    return {
+        "host": os.environ.get('HOST', '0.0.0.0'),
+        "port": int(os.environ.get('PORT', '8001')),
+        "workers": int(os.environ.get('WEB_CONCURRENCY', str(default_workers()))),
+        "loop": select_loop(),
+        "http": select_http(),
+        "timeout_keep_alive": int(os.environ.get('UVICORN_KEEPALIVE_TIMEOUT', '5')),
+        "backlog": int(os.environ.get('UVICORN_BACKLOG', '2048')),
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1'),
+        "log_level": os.environ.get('LOG_LEVEL', 'info'),
+    }
+
+def main():
+    options = uvicorn_options()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.info(
+        f"Starting {options['workers']} worker(s) on {options['host']}:{options['port']} "
+        f"(loop={options['loop']}, http={options['http']})"
+    )
+    # Workers import the app by path, so nothing from this process is inherited by them
+    uvicorn.run("server:app", app_dir=str(ROOT_DIR), **options)
+
+
+if __name__ == "__main__":
+    main()
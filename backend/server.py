@@ -1,30 +1,244 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+# Imported first so the cold start clock covers every import below
+from startup_report import startup_report
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
 import logging
+import asyncio
+import time
+import bisect
+import contextlib
+import contextvars
+import importlib
+import threading
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Literal
 import uuid
-import random
+import json
+import base64
+import hashlib
+import secrets
 import string
+from collections import OrderedDict, deque
 from datetime import datetime, timezone, timedelta
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
+import orjson
 
+if TYPE_CHECKING:
+    # Loaded on first use through stripe_provider
+    from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
+
+
+startup_report.mark_imported()
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Request Metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout"""
+    __slots__ = ("buckets", "counts", "total", "count")
+    
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class RequestStats:
+    """Database and Stripe work done on behalf of the current request"""
+    __slots__ = ("db_ops", "db_seconds", "stripe_calls", "stripe_seconds")
+    
+    def __init__(self):
+        self.db_ops = 0
+        self.db_seconds = 0.0
+        self.stripe_calls = 0
+        self.stripe_seconds = 0.0
+
+# Motor runs commands on executor threads with a copy of the caller's context, so the
+# per-request stats object is visible to the command listener
+current_request_stats: contextvars.ContextVar = contextvars.ContextVar("current_request_stats", default=None)
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in the Prometheus text format"""
+    
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[tuple, int] = {}
+        self.latency: Dict[tuple, Histogram] = {}
+        self.db_ops_per_request: Dict[tuple, Histogram] = {}
+        self.db_seconds_per_request: Dict[tuple, Histogram] = {}
+        self.stripe_calls_per_request: Dict[tuple, Histogram] = {}
+        self.mongo_commands: Dict[str, Histogram] = {}
+        self.stripe_calls: Dict[str, Histogram] = {}
+        # Command listener callbacks arrive on Motor's executor threads
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _histogram(histograms: Dict, key, buckets: tuple) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+    
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        self.requests[(method, route, status_code)] = self.requests.get((method, route, status_code), 0) + 1
+        self._histogram(self.latency, key, LATENCY_BUCKETS).observe(seconds)
+        self._histogram(self.db_ops_per_request, key, CALL_COUNT_BUCKETS).observe(stats.db_ops)
+        self._histogram(self.db_seconds_per_request, key, LATENCY_BUCKETS).observe(stats.db_seconds)
+        self._histogram(self.stripe_calls_per_request, key, CALL_COUNT_BUCKETS).observe(stats.stripe_calls)
+    
+    def observe_mongo_command(self, command_name: str, seconds: float):
+        with self._lock:
+            self._histogram(self.mongo_commands, command_name, LATENCY_BUCKETS).observe(seconds)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.db_ops += 1
+            stats.db_seconds += seconds
+    
+    def observe_stripe_call(self, operation: str, seconds: float):
+        self._histogram(self.stripe_calls, operation, LATENCY_BUCKETS).observe(seconds)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.stripe_calls += 1
+            stats.stripe_seconds += seconds
+    
+    def render(self) -> str:
+        lines = [
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}')
+        
+        per_route = (
+            ("http_request_duration_seconds", self.latency),
+            ("http_request_mongo_operations", self.db_ops_per_request),
+            ("http_request_mongo_duration_seconds", self.db_seconds_per_request),
+            ("http_request_stripe_calls", self.stripe_calls_per_request),
+        )
+        for name, histograms in per_route:
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), histogram in sorted(histograms.items()):
+                lines.extend(histogram.render(name, f'method="{method}",route="{route}"'))
+        
+        with self._lock:
+            mongo_commands = sorted(self.mongo_commands.items())
+        lines.append("# TYPE mongo_command_duration_seconds histogram")
+        for command_name, histogram in mongo_commands:
+            lines.extend(histogram.render("mongo_command_duration_seconds", f'command="{command_name}"'))
+        lines.append("# TYPE stripe_call_duration_seconds histogram")
+        for operation, histogram in sorted(self.stripe_calls.items()):
+            lines.extend(histogram.render("stripe_call_duration_seconds", f'operation="{operation}"'))
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        metrics.observe_mongo_command(event.command_name, event.duration_micros / 1_000_000)
+    
+    def failed(self, event):
+        metrics.observe_mongo_command(event.command_name, event.duration_micros / 1_000_000)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route request counts, latency and downstream calls"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            # The router stores the matched route in the scope; label by its template to bound cardinality
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - started,
+                stats
+            )
+            current_request_stats.reset(token)
+            if startup_report.mark_first_request():
+                logger.info(f"First request served: {startup_report.summary()}")
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Created in startup_event so every worker process opens its own pool after any fork
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+# Pool and timeout settings: (client option, environment variable)
+MONGO_CLIENT_OPTIONS = (
+    ("maxPoolSize", "MONGO_MAX_POOL_SIZE"),
+    ("minPoolSize", "MONGO_MIN_POOL_SIZE"),
+    ("maxIdleTimeMS", "MONGO_MAX_IDLE_TIME_MS"),
+    ("waitQueueTimeoutMS", "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+    ("connectTimeoutMS", "MONGO_CONNECT_TIMEOUT_MS"),
+    ("socketTimeoutMS", "MONGO_SOCKET_TIMEOUT_MS"),
+    ("serverSelectionTimeoutMS", "MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+)
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    options = {option: int(os.environ[variable]) for option, variable in MONGO_CLIENT_OPTIONS if os.environ.get(variable)}
+    return AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[MongoCommandMetrics()], **options)
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson rendering; naive datetimes (e.g. from mongomock) are treated as UTC"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
 
 # Create the main app without a prefix
-app = FastAPI(title="Snatched Beauties API", version="2.0.0")
+app = FastAPI(title="Snatched Beauties API", version="2.0.0", default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -63,6 +277,7 @@ class LeadCreate(BaseModel):
     email: EmailStr
     name: Optional[str] = None
     phone: Optional[str] = None
+    source: Optional[str] = None  # e.g. "instagram", "popup"; missing means direct
 
 class LeadResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -71,6 +286,7 @@ class LeadResponse(BaseModel):
     email: str
     name: Optional[str] = None
     phone: Optional[str] = None
+    source: Optional[str] = None
     coupon_code: str
     discount: str = "15%"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -120,6 +336,7 @@ class BookingResponse(BaseModel):
     customer_email: str
     customer_phone: Optional[str] = None
     special_requests: Optional[str] = None
+    slot: Optional[Dict[str, Any]] = None
     status: str = "pending"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -133,16 +350,1301 @@ class PaymentRequest(BaseModel):
     success_url: Optional[str] = None
     cancel_url: Optional[str] = None
 
+# Database Indexes
+# Every query a route issues must be backed by one of these; see QUERY_SHAPES below.
+COLLECTION_INDEXES = {
+    "leads": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("coupon_code", ASCENDING)], unique=True, name="coupon_code_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], unique=True, name="session_id_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        # Watermark scan of the incremental export (exports.py)
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="updated_at_id"),
+        # $lookup from leads in the revenue funnel
+        IndexModel([("customer_email", ASCENDING)], name="customer_email"),
+        IndexModel([("payment_status", ASCENDING), ("created_at", ASCENDING)], name="payment_status_created_at"),
+    ],
+    "bookings": [
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("preferred_date", ASCENDING)], name="preferred_date"),
+    ],
+    "booking_slots": [
+        IndexModel([("date", ASCENDING), ("block", ASCENDING)], unique=True, name="date_block_unique"),
+        IndexModel([("booking_id", ASCENDING)], name="booking_id"),
+    ],
+    "status_checks": [
+        IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id_desc"),
+    ],
+    "coupon_codes": [
+        IndexModel([("code", ASCENDING)], unique=True, name="code_unique"),
+    ],
+    "webhook_events": [
+        IndexModel([("event_id", ASCENDING)], unique=True, name="event_id_unique"),
+        IndexModel([("processed", ASCENDING), ("received_at", ASCENDING)], name="processed_received_at"),
+        IndexModel([("processed_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600, name="processed_at_ttl"),
+    ],
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+# (route, collection, filter, sort) for each query issued by the API, used by verify_query_plans
+QUERY_SHAPES = [
+    ("create_lead", "leads", {"email": "probe@example.com"}, None),
+    ("get_all_leads", "leads", {}, {"created_at": -1, "id": -1}),
+    ("get_all_bookings", "bookings", {}, {"created_at": -1, "id": -1}),
+    ("availability_rebuild", "bookings", {"preferred_date": {"$gte": "1970-01-01"}, "status": {"$ne": "cancelled"}, "slot": {"$exists": False}}, None),
+    ("availability_day", "booking_slots", {"date": {"$in": ["1970-01-01"]}}, None),
+    ("availability_release", "booking_slots", {"booking_id": "probe"}, None),
+    ("availability_release_many", "booking_slots", {"booking_id": {"$in": ["probe"]}}, None),
+    ("get_payment_status", "payment_transactions", {"session_id": "cs_probe"}, None),
+    ("get_payment_transactions", "payment_transactions", {}, {"created_at": -1, "id": -1}),
+    ("stripe_webhook", "payment_transactions", {"session_id": "cs_probe"}, None),
+    ("get_status_checks", "status_checks", {}, {"timestamp": -1, "id": -1}),
+    ("webhook_worker", "webhook_events", {"processed": False}, {"received_at": 1}),
+    ("payment_reconciler", "payment_transactions", {"payment_status": {"$in": ["pending", "unpaid"]}}, {"created_at": 1}),
+]
+
+async def find_duplicate_keys(collection_name: str, keys: List[str], limit: int = 5) -> List[Dict[str, Any]]:
+    """Key values held by more than one document, i.e. what blocks a unique index on keys"""
+    pipeline = [
+        {"$group": {"_id": {key: f"${key}" for key in keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit}
+    ]
+    return await db[collection_name].aggregate(pipeline, allowDiskUse=True).to_list(limit)
+
+async def ensure_indexes():
+    """Create the indexes declared in COLLECTION_INDEXES (no-op when they already exist)"""
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        created = []
+        # One call per index, so a unique index blocked by existing duplicates cannot hold back the others
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                created.extend(await db[collection_name].create_indexes([index]))
+            except Exception as e:
+                # Existing duplicate data blocks unique indexes; keep serving and surface it loudly
+                if isinstance(e, OperationFailure) and e.code == 11000 and index.document.get("unique"):
+                    keys = list(index.document["key"].keys())
+                    duplicates = await find_duplicate_keys(collection_name, keys)
+                    described = ", ".join(f"{dup['_id']} x{dup['count']}" for dup in duplicates)
+                    logger.error(f"Unique index {name} on {collection_name} blocked by duplicate values: {described}")
+                else:
+                    logger.error(f"Index {name} creation failed on {collection_name}: {str(e)}")
+        if created:
+            logger.info(f"Indexes ready on {collection_name}: {', '.join(created)}")
+
+def _plan_stages(plan: Dict[str, Any]):
+    """Yield every stage name in an explain() plan tree"""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+async def verify_query_plans() -> Dict[str, List[str]]:
+    """Explain every declared query shape and fail if any falls back to a collection scan"""
+    plans = {}
+    collscans = []
+    for route, collection_name, query, sort in QUERY_SHAPES:
+        find = {"find": collection_name, "filter": query}
+        if sort:
+            find["sort"] = sort
+        explain = await db.command("explain", find, verbosity="queryPlanner")
+        stages = list(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        plans[f"{route}:{collection_name}"] = stages
+        if "COLLSCAN" in stages:
+            collscans.append(f"{route} ({collection_name} {query})")
+    
+    if collscans:
+        raise RuntimeError(f"Query shapes without index support: {'; '.join(collscans)}")
+    return plans
+
+# Timestamp Migration
+# Older documents stored these fields as ISO strings; they are rewritten to BSON dates
+DATETIME_FIELDS = {
+    "leads": ["created_at", "expires_at"],
+    "bookings": ["created_at", "updated_at"],
+    "payment_transactions": ["created_at", "updated_at"],
+    "contact_forms": ["created_at"],
+    "status_checks": ["timestamp"],
+    "coupon_codes": ["reserved_at"],
+}
+MIGRATION_BATCH_SIZE = int(os.environ.get('DATETIME_MIGRATION_BATCH_SIZE', '500'))
+
+async def migrate_string_timestamps(collection_name: str, field: str) -> int:
+    """Rewrite one string timestamp field to BSON dates in _id order, one bulk_write per batch"""
+    collection = db[collection_name]
+    migrated = 0
+    last_id = None
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        docs = await collection.find(query, {field: 1}).sort("_id", ASCENDING).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not docs:
+            return migrated
+        last_id = docs[-1]["_id"]
+        
+        updates = []
+        for doc in docs:
+            try:
+                value = datetime.fromisoformat(doc[field])
+            except ValueError:
+                logger.warning(f"Skipping unparseable {collection_name}.{field} on {doc['_id']}: {doc[field]!r}")
+                continue
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            # Match on the old value so a concurrent rewrite of the field is never clobbered
+            updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if updates:
+            result = await collection.bulk_write(updates, ordered=False)
+            migrated += result.modified_count
+
+async def migrate_datetime_fields():
+    for collection_name, fields in DATETIME_FIELDS.items():
+        for field in fields:
+            try:
+                migrated = await migrate_string_timestamps(collection_name, field)
+                if migrated:
+                    logger.info(f"Migrated {migrated} {collection_name}.{field} values to BSON dates")
+            except Exception as e:
+                logger.error(f"Timestamp migration failed on {collection_name}.{field}: {str(e)}")
+
+# Background Tasks
+background_tasks = set()
+
+def start_background_task(coro) -> asyncio.Task:
+    """Run a coroutine for the life of the process; cancelled in shutdown_db_client"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def wait_for_event(event: asyncio.Event, timeout: float) -> bool:
+    """Wait until event is set or timeout passes; returns whether it was set.
+    asyncio.wait_for can swallow a cancel that lands as the event fires, leaving stop() waiting forever."""
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        done, _ = await asyncio.wait({waiter}, timeout=timeout)
+    finally:
+        waiter.cancel()
+    return bool(done)
+
+# In-process Caching
+class TTLCache:
+    """Keeps computed values for a short time so polled endpoints skip the database;
+    bounded to max_entries, evicting the least recently used entry"""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        # One computation in flight per key, awaited by every caller that misses on it
+        self._computing: Dict[Any, asyncio.Future] = {}
+    
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+    
+    async def get_or_compute(self, key, compute):
+        """Return the cached value, computing it once for concurrent callers on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        computing = self._computing.get(key)
+        if computing is None:
+            computing = self._computing[key] = asyncio.ensure_future(self._compute(key, compute))
+        # Shielded so a caller that disconnects does not cancel the computation for the others
+        return await asyncio.shield(computing)
+    
+    async def _compute(self, key, compute):
+        try:
+            value = await compute()
+            self.set(key, value)
+            return value
+        finally:
+            del self._computing[key]
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry when full"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+    
+    def set(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+lead_stats_cache = TTLCache(float(os.environ.get('LEAD_STATS_CACHE_TTL', '30')))
+revenue_analytics_cache = TTLCache(
+    float(os.environ.get('REVENUE_ANALYTICS_CACHE_TTL', '300')),
+    max_entries=int(os.environ.get('REVENUE_ANALYTICS_CACHE_SIZE', '256'))
+)
+
+# Admin List Pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """Opaque keyset cursor pointing just past `doc` in (sort_field, id) order"""
+    value = doc.get(sort_field)
+    position = {"v": value, "id": doc.get("id")}
+    if isinstance(value, datetime):
+        position = {"v": value.isoformat(), "t": "date", "id": doc.get("id")}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(after: str) -> tuple:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(after.encode()))
+        value = position["v"]
+        if position.get("t") == "date":
+            value = datetime.fromisoformat(value)
+        return value, position["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_cursor(collection, sort_field: str, after: Optional[str] = None, limit: Optional[int] = None):
+    """Motor cursor over a collection, newest first, resuming after the given cursor"""
+    query = {}
+    if after:
+        value, last_id = decode_cursor(after)
+        query = {"$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "id": {"$lt": last_id}}
+        ]}
+    cursor = collection.find(query, {"_id": 0}).sort([(sort_field, DESCENDING), ("id", DESCENDING)])
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+async def fetch_page(collection, sort_field: str, limit: Optional[int], after: Optional[str]) -> tuple:
+    """Return one page of documents and the cursor for the next page (None on the last page)"""
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    # Read one extra document to learn whether another page exists
+    docs = await keyset_cursor(collection, sort_field, after, page_size + 1).to_list(page_size + 1)
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+def stream_ndjson(collection, sort_field: str, limit: Optional[int], after: Optional[str]) -> StreamingResponse:
+    """Stream documents as NDJSON straight from the Motor cursor without buffering the result"""
+    async def lines():
+        async for doc in keyset_cursor(collection, sort_field, after, limit):
+            yield orjson.dumps(doc, option=orjson.OPT_NAIVE_UTC | orjson.OPT_APPEND_NEWLINE)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def list_documents(collection, key: str, limit: Optional[int], after: Optional[str], format: str):
+    """Shared body of the admin list endpoints"""
+    if format == "ndjson":
+        return stream_ndjson(collection, "created_at", limit, after)
+    
+    docs, next_cursor = await fetch_page(collection, "created_at", limit, after)
+    # Projected Mongo documents are already JSON-safe, so skip jsonable_encoder entirely
+    return FastJSONResponse({key: docs, "total": len(docs), "next_cursor": next_cursor})
+
+COUPON_CODE_CHARS = string.ascii_uppercase + string.digits
+
 def generate_coupon_code():
-    """Generate a unique coupon code like SNATCH-XXXX"""
-    chars = string.ascii_uppercase + string.digits
-    random_part = ''.join(random.choices(chars, k=6))
+    """Generate a candidate coupon code like SNATCH-XXXXXX (uniqueness comes from CouponAllocator)"""
+    random_part = ''.join(secrets.choice(COUPON_CODE_CHARS) for _ in range(6))
     return f"SNATCH-{random_part}"
 
+class CouponAllocator:
+    """Pool of coupon codes already reserved in coupon_codes, so handing one out never collides"""
+    
+    def __init__(self, pool_size: int, low_watermark: int):
+        self.pool_size = pool_size
+        self.low_watermark = low_watermark
+        self._pool: deque = deque()
+        self._refill_lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+    
+    async def seed_issued_codes(self, batch_size: int = 1000) -> int:
+        """Copy codes already held by leads into coupon_codes, so a fresh code can never match one of them.
+        Runs once per database: codes issued since then were reserved in coupon_codes before use.
+        Until it finishes, the unique index on leads still catches a collision and create_lead retries."""
+        if await db.job_leases.find_one({"_id": "coupon_seed", "completed_at": {"$ne": None}}, {"_id": 1}):
+            return 0
+        seeded = 0
+        batch = []
+        try:
+            async for lead in db.leads.find({"coupon_code": {"$type": "string"}}, {"_id": 0, "coupon_code": 1}):
+                batch.append({"code": lead["coupon_code"], "reserved_at": datetime.now(timezone.utc)})
+                if len(batch) >= batch_size:
+                    seeded += await self._insert_issued(batch)
+                    batch = []
+            if batch:
+                seeded += await self._insert_issued(batch)
+            await db.job_leases.update_one(
+                {"_id": "coupon_seed"},
+                {"$set": {"completed_at": datetime.now(timezone.utc), "seeded": seeded}},
+                upsert=True
+            )
+        except Exception as e:
+            # No marker is written, so the next start picks the scan up again
+            logger.error(f"Seeding issued coupon codes failed after {seeded} codes: {str(e)}")
+            return seeded
+        if seeded:
+            logger.info(f"Seeded {seeded} previously issued coupon codes into the pool registry")
+        return seeded
+    
+    async def _insert_issued(self, docs: List[Dict[str, Any]]) -> int:
+        try:
+            result = await db.coupon_codes.insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Most codes are already registered after the first run
+            return e.details.get("nInserted", 0)
+    
+    async def reserve(self, count: int) -> int:
+        """Claim up to `count` fresh codes through the unique index in one bulk insert"""
+        candidates = list({generate_coupon_code() for _ in range(count)})
+        now = datetime.now(timezone.utc)
+        docs = [{"code": code, "reserved_at": now} for code in candidates]
+        try:
+            await db.coupon_codes.insert_many(docs, ordered=False)
+            reserved = candidates
+        except BulkWriteError as e:
+            # Codes another worker (or an earlier run) already holds are simply dropped
+            taken = {candidates[error["index"]] for error in e.details.get("writeErrors", [])}
+            reserved = [code for code in candidates if code not in taken]
+        self._pool.extend(reserved)
+        return len(reserved)
+    
+    async def refill(self):
+        async with self._refill_lock:
+            missing = self.pool_size - len(self._pool)
+            if missing > 0:
+                reserved = await self.reserve(missing)
+                logger.info(f"Coupon pool refilled with {reserved} codes ({len(self._pool)} available)")
+    
+    def _schedule_refill(self):
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self.refill())
+    
+    async def allocate(self) -> str:
+        """Pop a prevalidated code; refills happen in the background below the low watermark"""
+        if not self._pool:
+            # Only reached before the startup fill or after a burst drained the pool
+            await self.refill()
+        if not self._pool:
+            raise HTTPException(status_code=503, detail="Coupon codes are temporarily unavailable, please retry")
+        code = self._pool.popleft()
+        if len(self._pool) < self.low_watermark:
+            self._schedule_refill()
+        return code
+    
+    def release(self, code: str):
+        """Return an allocated but unused code to the front of the pool"""
+        self._pool.appendleft(code)
+
+coupon_allocator = CouponAllocator(
+    pool_size=int(os.environ.get('COUPON_POOL_SIZE', '500')),
+    low_watermark=int(os.environ.get('COUPON_POOL_LOW_WATERMARK', '100'))
+)
+
+# Payment Provider
+class StripeProvider:
+    """Imports the Stripe checkout integration on first use, so workers that only serve
+    catalog and lead traffic never pay for it"""
+    
+    module_name = "emergentintegrations.payments.stripe.checkout"
+    
+    def __init__(self):
+        self._module = None
+    
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+    
+    def load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self.module_name)
+            seconds = time.perf_counter() - started
+            startup_report.record_lazy_import(self.module_name, seconds)
+            logger.info(f"Stripe integration loaded in {seconds * 1000:.0f}ms")
+        return self._module
+    
+    def use(self, module):
+        """Serve checkouts from another module exposing StripeCheckout and CheckoutSessionRequest (e.g. a fake)"""
+        self._module = module
+    
+    def checkout(self, api_key: str, webhook_url: str) -> "StripeCheckout":
+        return self.load().StripeCheckout(api_key=api_key, webhook_url=webhook_url)
+    
+    def session_request(self, **fields) -> "CheckoutSessionRequest":
+        return self.load().CheckoutSessionRequest(**fields)
+
+stripe_provider = StripeProvider()
+
+# Stripe Client Registry
+class PooledStripeCheckout:
+    """StripeCheckout wrapper that bounds the number of concurrent calls to Stripe"""
+    
+    def __init__(self, checkout: "StripeCheckout", semaphore: asyncio.Semaphore):
+        self.checkout = checkout
+        self._semaphore = semaphore
+    
+    async def _call(self, operation: str, *args):
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                return await getattr(self.checkout, operation)(*args)
+            finally:
+                metrics.observe_stripe_call(operation, time.perf_counter() - started)
+    
+    async def create_checkout_session(self, checkout_request: "CheckoutSessionRequest") -> "CheckoutSessionResponse":
+        return await self._call("create_checkout_session", checkout_request)
+    
+    async def get_checkout_status(self, session_id: str) -> "CheckoutStatusResponse":
+        return await self._call("get_checkout_status", session_id)
+    
+    async def handle_webhook(self, body: bytes, signature: str):
+        # Signature checks are local, but keep them under the same budget as upstream calls
+        return await self._call("handle_webhook", body, signature)
+
+class StripeClientRegistry:
+    """Process-wide StripeCheckout clients keyed by webhook URL over one keep-alive HTTP pool"""
+    
+    def __init__(self, max_concurrency: int, pool_size: int, max_clients: int):
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.max_clients = max_clients
+        # Swappable so benchmarks and tests can run against a fake Stripe; defaults to stripe_provider
+        self.checkout_factory = None
+        # Bounded: without PUBLIC_BASE_URL the webhook URL comes from the client-supplied Host header
+        self._clients = LRUCache(max_clients)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._http_session = None
+    
+    def start(self):
+        """Install a pooled HTTP client for the Stripe SDK so connections and TLS sessions are reused"""
+        if self._http_session is not None:
+            return
+        # Part of the payment stack, so imported with it rather than at module load
+        started = time.perf_counter()
+        import requests
+        import stripe
+        from requests.adapters import HTTPAdapter
+        startup_report.record_lazy_import("stripe", time.perf_counter() - started)
+        
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self._http_session.mount("https://", adapter)
+        stripe.default_http_client = stripe.RequestsClient(session=self._http_session)
+        logger.info(f"Stripe client pool ready (pool size {self.pool_size}, max concurrency {self.max_concurrency})")
+    
+    def get(self, webhook_url: str) -> PooledStripeCheckout:
+        if self._http_session is None:
+            self.start()
+        client = self._clients.get(webhook_url)
+        if client is None:
+            factory = self.checkout_factory or stripe_provider.checkout
+            checkout = factory(api_key=stripe_api_key, webhook_url=webhook_url)
+            client = PooledStripeCheckout(checkout, self._semaphore)
+            self._clients.set(webhook_url, client)
+        return client
+    
+    def close(self):
+        self._clients = LRUCache(self.max_clients)
+        if self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
+            import stripe
+            stripe.default_http_client = None
+
+stripe_clients = StripeClientRegistry(
+    max_concurrency=int(os.environ.get('STRIPE_MAX_CONCURRENCY', '10')),
+    pool_size=int(os.environ.get('STRIPE_HTTP_POOL_SIZE', '20')),
+    max_clients=int(os.environ.get('STRIPE_MAX_CLIENTS', '16'))
+)
+
+# Checkout Status Caching
+# Sessions in these states never change again, so their status is served locally
+TERMINAL_PAYMENT_STATUSES = {"paid"}
+TERMINAL_SESSION_STATUSES = {"expired"}
+
+payment_status_cache = LRUCache(int(os.environ.get('PAYMENT_STATUS_CACHE_SIZE', '2048')))
+_status_refreshes: Dict[str, asyncio.Future] = {}
+
+def is_terminal_checkout(checkout_status: Dict[str, Any]) -> bool:
+    return (checkout_status["payment_status"] in TERMINAL_PAYMENT_STATUSES
+            or checkout_status["status"] in TERMINAL_SESSION_STATUSES)
+
+async def refresh_checkout_status(session_id: str, base_url: str) -> Dict[str, Any]:
+    """Fetch a session from Stripe, sharing one upstream call between concurrent pollers"""
+    refresh = _status_refreshes.get(session_id)
+    if refresh is None:
+        refresh = asyncio.ensure_future(_fetch_checkout_status(session_id, base_url))
+        _status_refreshes[session_id] = refresh
+        refresh.add_done_callback(lambda _: _status_refreshes.pop(session_id, None))
+    # Shield so one poller disconnecting does not cancel the call the others are waiting on
+    return await asyncio.shield(refresh)
+
+async def _fetch_checkout_status(session_id: str, base_url: str) -> Dict[str, Any]:
+    stripe_checkout = get_stripe_checkout(base_url)
+    
+    # Get status from Stripe
+    checkout_status: "CheckoutStatusResponse" = await stripe_checkout.get_checkout_status(session_id)
+    status_response = checkout_status_response(session_id, checkout_status)
+    
+    result = await db.payment_transactions.update_one(*checkout_status_update(status_response))
+    if result.modified_count:
+        logger.info(f"Payment status updated for session {session_id}: {checkout_status.payment_status}")
+    
+    return status_response
+
+def checkout_status_response(session_id: str, checkout_status: "CheckoutStatusResponse") -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "status": checkout_status.status,
+        "payment_status": checkout_status.payment_status,
+        "amount_total": checkout_status.amount_total,
+        "currency": checkout_status.currency,
+        "metadata": checkout_status.metadata
+    }
+
+def checkout_status_update(status_response: Dict[str, Any]) -> tuple:
+    """(filter, update) recording a Stripe status on its transaction"""
+    session_id = status_response["session_id"]
+    payment_status = status_response["payment_status"]
+    
+    # Update only if status has changed to avoid duplicate processing; terminal
+    # sessions also keep a snapshot of the response for later polls
+    changes = {
+        "payment_status": payment_status,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    query = {"session_id": session_id, "payment_status": {"$ne": payment_status}}
+    if is_terminal_checkout(status_response):
+        changes["checkout_status"] = status_response
+        query = {"session_id": session_id, "$or": [
+            {"payment_status": {"$ne": payment_status}},
+            {"checkout_status": {"$exists": False}}
+        ]}
+        payment_status_cache.set(session_id, status_response)
+    return query, {"$set": changes}
+
 # Initialize Stripe Checkout
-def get_stripe_checkout(base_url: str) -> StripeCheckout:
+# The public origin for webhook and redirect URLs; the request's Host header is only a fallback
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '').rstrip('/')
+
+def public_base_url(request: Request) -> str:
+    return PUBLIC_BASE_URL or str(request.base_url).rstrip('/')
+
+def get_stripe_checkout(base_url: str) -> PooledStripeCheckout:
     webhook_url = f"{base_url}/api/webhook/stripe"
-    return StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+    return stripe_clients.get(webhook_url)
+
+# Idempotency Keys
+class IdempotencyStore:
+    """Replays the stored response for a repeated Idempotency-Key instead of running the request again"""
+    
+    def __init__(self, ttl_seconds: float, lock_seconds: float, cache_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        # key -> (fingerprint, response, monotonic deadline) for completed requests
+        self._completed = LRUCache(cache_size)
+        # key -> (fingerprint, future) for requests running in this process
+        self._in_flight: Dict[str, tuple] = {}
+    
+    @staticmethod
+    def fingerprint(payload: Dict[str, Any]) -> str:
+        return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    
+    async def run(self, key: str, fingerprint: str, compute) -> tuple:
+        """Return (response, replayed), calling compute at most once per key across workers"""
+        cached = self._completed.get(key)
+        if cached is not None and cached[2] > time.monotonic():
+            self._check_fingerprint(cached[0], fingerprint)
+            return cached[1], True
+        
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            # A concurrent duplicate (e.g. a double-click) waits for the first request's result
+            self._check_fingerprint(in_flight[0], fingerprint)
+            response, _ = await asyncio.shield(in_flight[1])
+            return response, True
+        
+        future = asyncio.ensure_future(self._execute(key, fingerprint, compute))
+        self._in_flight[key] = (fingerprint, future)
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+    
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str):
+        if stored != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    
+    async def _execute(self, key: str, fingerprint: str, compute) -> tuple:
+        now = datetime.now(timezone.utc)
+        lock_id = str(uuid.uuid4())
+        record = {
+            "_id": key,
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "lock_id": lock_id,
+            "locked_until": now + timedelta(seconds=self.lock_seconds),
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds)
+        }
+        try:
+            await db.idempotency_keys.insert_one(record)
+        except DuplicateKeyError:
+            existing = await db.idempotency_keys.find_one({"_id": key})
+            if existing is None:
+                # Expired between the insert and the read; the caller can simply retry
+                raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is being processed")
+            self._check_fingerprint(existing["fingerprint"], fingerprint)
+            if existing["status"] == "completed":
+                self._remember(key, fingerprint, existing["response"])
+                return existing["response"], True
+            # Another worker holds the key and renews the lock while its request runs; a lapsed
+            # lock means that worker died, so take the key over
+            claimed = await db.idempotency_keys.find_one_and_update(
+                {"_id": key, "status": "in_progress", "locked_until": {"$lt": now}},
+                {"$set": {"lock_id": lock_id, "locked_until": record["locked_until"]}}
+            )
+            if claimed is None:
+                raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is being processed")
+        
+        renewal = asyncio.create_task(self._renew_lock(key, lock_id))
+        try:
+            response = await compute()
+        except BaseException:
+            # Failed requests are not recorded, so the client may retry with the same key
+            await db.idempotency_keys.delete_one({"_id": key, "lock_id": lock_id})
+            raise
+        finally:
+            renewal.cancel()
+        
+        await db.idempotency_keys.update_one(
+            {"_id": key, "lock_id": lock_id},
+            {"$set": {"status": "completed", "response": response}, "$unset": {"locked_until": "", "lock_id": ""}}
+        )
+        self._remember(key, fingerprint, response)
+        return response, False
+    
+    async def _renew_lock(self, key: str, lock_id: str):
+        """Push locked_until forward while compute() runs, so a slow Stripe call is not taken over"""
+        while True:
+            await asyncio.sleep(self.lock_seconds / 3)
+            try:
+                result = await db.idempotency_keys.update_one(
+                    {"_id": key, "lock_id": lock_id},
+                    {"$set": {"locked_until": datetime.now(timezone.utc) + timedelta(seconds=self.lock_seconds)}}
+                )
+                if not result.matched_count:
+                    logger.warning(f"Lost the lock on Idempotency-Key {key} while its request was running")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew the lock on Idempotency-Key {key}: {str(e)}")
+    
+    def _remember(self, key: str, fingerprint: str, response: Dict[str, Any]):
+        self._completed.set(key, (fingerprint, response, time.monotonic() + self.ttl_seconds))
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_KEY_TTL', str(24 * 3600))),
+    lock_seconds=float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '60')),
+    cache_size=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '4096'))
+)
+
+# Webhook Ingestion Queue
+class WebhookQueue:
+    """Durable queue of verified Stripe events, applied to payment_transactions in batches"""
+    
+    def __init__(self, batch_size: int, poll_interval: float, claim_seconds: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_seconds = claim_seconds
+        self.processed_total = 0
+        self.duplicates_total = 0
+        self.last_batch_at: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def enqueue(self, webhook_response, body: bytes) -> bool:
+        """Persist a verified event; returns False when Stripe redelivered one already queued"""
+        event_id = getattr(webhook_response, "event_id", None) or hashlib.sha256(body).hexdigest()
+        event = {
+            "event_id": event_id,
+            "event_type": webhook_response.event_type,
+            "session_id": webhook_response.session_id,
+            "payment_status": webhook_response.payment_status,
+            "payload": body.decode("utf-8", errors="replace"),
+            "processed": False,
+            "received_at": datetime.now(timezone.utc)
+        }
+        try:
+            await db.webhook_events.insert_one(event)
+        except DuplicateKeyError:
+            self.duplicates_total += 1
+            return False
+        self._wakeup.set()
+        return True
+    
+    async def claim_batch(self) -> List[Dict[str, Any]]:
+        """Claim the oldest unclaimed events for this worker so each event is applied by one worker only"""
+        now = datetime.now(timezone.utc)
+        unclaimed = {"processed": False, "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}]}
+        candidates = await db.webhook_events.find(
+            unclaimed, {"_id": 0, "event_id": 1}
+        ).sort("received_at", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+        # The filter is re-checked per document, so a worker racing for the same events only gets the ones it won
+        claim_id = str(uuid.uuid4())
+        event_ids = [event["event_id"] for event in candidates]
+        await db.webhook_events.update_many(
+            {**unclaimed, "event_id": {"$in": event_ids}},
+            {"$set": {"claim_id": claim_id, "claimed_until": now + timedelta(seconds=self.claim_seconds)}}
+        )
+        return await db.webhook_events.find(
+            {"event_id": {"$in": event_ids}, "claim_id": claim_id},
+            {"_id": 0, "event_id": 1, "session_id": 1, "payment_status": 1}
+        ).sort("received_at", ASCENDING).to_list(self.batch_size)
+    
+    async def process_batch(self) -> int:
+        """Apply the oldest pending events; returns how many were consumed"""
+        events = await self.claim_batch()
+        if not events:
+            return 0
+        
+        # Events arrive oldest first, so the last one per session carries its current status
+        latest_status = {event["session_id"]: event["payment_status"] for event in events if event.get("session_id")}
+        now = datetime.now(timezone.utc)
+        if latest_status:
+            await db.payment_transactions.bulk_write([
+                UpdateOne(
+                    {"session_id": session_id},
+                    {"$set": {"payment_status": payment_status, "updated_at": now}}
+                )
+                for session_id, payment_status in latest_status.items()
+            ], ordered=False)
+            for session_id in latest_status:
+                payment_status_cache.invalidate(session_id)
+        
+        await db.webhook_events.update_many(
+            {"event_id": {"$in": [event["event_id"] for event in events]}},
+            {"$set": {"processed": True, "processed_at": now}}
+        )
+        self.processed_total += len(events)
+        self.last_batch_at = now
+        logger.info(f"Webhook batch applied: {len(events)} events, {len(latest_status)} sessions")
+        return len(events)
+    
+    async def metrics(self) -> Dict[str, Any]:
+        depth = await db.webhook_events.count_documents({"processed": False})
+        oldest = await db.webhook_events.find_one(
+            {"processed": False},
+            {"_id": 0, "received_at": 1},
+            sort=[("received_at", ASCENDING)]
+        )
+        lag_seconds = 0.0
+        if oldest:
+            lag_seconds = (datetime.now(timezone.utc) - oldest["received_at"]).total_seconds()
+        return {
+            "depth": depth,
+            "lag_seconds": round(lag_seconds, 3),
+            "processed_total": self.processed_total,
+            "duplicates_total": self.duplicates_total,
+            "last_batch_at": self.last_batch_at.isoformat() if self.last_batch_at else None
+        }
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        # Unprocessed events stay in the collection and are picked up on the next start
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                consumed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Webhook batch failed: {str(e)}")
+                consumed = 0
+            if consumed < self.batch_size:
+                # Sleep until a new event lands, polling as a fallback for other workers' events
+                self._wakeup.clear()
+                await wait_for_event(self._wakeup, self.poll_interval)
+
+webhook_queue = WebhookQueue(
+    batch_size=int(os.environ.get('WEBHOOK_BATCH_SIZE', '100')),
+    poll_interval=float(os.environ.get('WEBHOOK_POLL_INTERVAL', '5')),
+    # A claim outlives a crashed worker by this long before another worker retries its events
+    claim_seconds=float(os.environ.get('WEBHOOK_CLAIM_SECONDS', '60'))
+)
+
+# Write-behind Inserts
+class WriteBehindBuffer:
+    """Buffers documents nobody reads back immediately and writes them with insert_many"""
+    
+    def __init__(self, collection_name: str, enabled: bool, batch_size: int, flush_interval: float, max_pending: int):
+        self.collection_name = collection_name
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushed_total = 0
+        self.sync_writes_total = 0
+        self.failed_flushes_total = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+    
+    async def insert(self, doc: Dict[str, Any]):
+        if self._task is None or len(self._pending) >= self.max_pending:
+            # Disabled, not started or full: write inline, which also slows callers down to the flush rate
+            self.sync_writes_total += 1
+            await db[self.collection_name].insert_one(doc)
+            return
+        self._pending.append(doc)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+    
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns how many documents were stored"""
+        async with self._flush_lock:
+            stored = 0
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    result = await db[self.collection_name].insert_many(batch, ordered=False)
+                    stored += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    # Duplicate _ids were written by an earlier attempt whose reply was lost
+                    retry = [batch[error["index"]] for error in e.details.get("writeErrors", [])
+                             if error.get("code") != 11000]
+                    stored += e.details.get("nInserted", 0)
+                    if retry:
+                        self._requeue(retry)
+                        break
+                except Exception as e:
+                    # insert_many already assigned _ids, so a retry cannot store a document twice
+                    self._requeue(batch)
+                    logger.error(f"Write-behind flush to {self.collection_name} failed: {str(e)}")
+                    break
+                except BaseException:
+                    # Cancelled mid-write: keep the batch so the final flush in stop() can still store it
+                    self._requeue(batch)
+                    raise
+            self.flushed_total += stored
+            return stored
+    
+    def _requeue(self, docs: List[Dict[str, Any]]):
+        self.failed_flushes_total += 1
+        self._pending[:0] = docs
+    
+    def start(self):
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            # Not cancelled: a flush in progress finishes its batch before the loop exits
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"Write-behind shutdown left {len(self._pending)} {self.collection_name} documents unwritten")
+    
+    async def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            await wait_for_event(self._wakeup, self.flush_interval)
+            await self.flush()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "flushed_total": self.flushed_total,
+            "sync_writes_total": self.sync_writes_total,
+            "failed_flushes_total": self.failed_flushes_total
+        }
+
+def create_write_buffer(collection_name: str) -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        collection_name,
+        enabled=os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true',
+        batch_size=int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '200')),
+        flush_interval=float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', '1')),
+        max_pending=int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '5000'))
+    )
+
+# Contact forms and status checks are only read back by admin listings
+write_buffers = {name: create_write_buffer(name) for name in ("contact_forms", "status_checks")}
+
+# Rate Limiting
+# Clients are keyed by scope["client"]. Behind a reverse proxy (the preview/ingress proxy, a load
+# balancer) uvicorn's proxy_headers rewrites it from X-Forwarded-For, but only for peers listed in
+# FORWARDED_ALLOW_IPS (read by launcher.py and by the uvicorn CLI alike); it must name the proxy
+# addresses, or every visitor is keyed on the proxy and shares one bucket.
+# Public write endpoints: (method, path) -> (requests per minute, burst)
+DEFAULT_RATE_LIMITS = {
+    ("POST", "/api/leads"): (10, 5),
+    ("POST", "/api/contact"): (5, 3),
+    ("POST", "/api/bookings"): (10, 5),
+    ("POST", "/api/bookings/batch"): (2, 2),
+    ("POST", "/api/payments/checkout"): (10, 5),
+}
+
+def load_rate_limits() -> Dict[tuple, tuple]:
+    """DEFAULT_RATE_LIMITS, overridden by RATE_LIMIT_RULES, e.g. {"POST /api/leads": [20, 10]}"""
+    rules = dict(DEFAULT_RATE_LIMITS)
+    for route, (per_minute, burst) in json.loads(os.environ.get('RATE_LIMIT_RULES', '{}')).items():
+        method, path = route.split(" ", 1)
+        rules[(method.upper(), path)] = (float(per_minute), int(burst))
+    return rules
+
+class InMemoryRateLimitBackend:
+    """Token bucket per key, local to this process"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, last refill); least recently seen first so idle clients are evicted
+        self._buckets: OrderedDict = OrderedDict()
+    
+    async def acquire(self, key: str, per_minute: float, burst: int) -> float:
+        """Take a token; returns 0 when admitted, otherwise seconds until one is available"""
+        now = time.monotonic()
+        rate = per_minute / 60
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            # A bucket idle long enough to be evicted has usually refilled anyway
+            self._buckets.popitem(last=False)
+        return retry_after
+
+class MongoRateLimitBackend:
+    """Fixed-window counters in the rate_limits collection, shared by every worker"""
+    
+    async def acquire(self, key: str, per_minute: float, burst: int) -> float:
+        # A window admits `burst` requests and lasts as long as the bucket takes to refill
+        window_seconds = burst * 60 / per_minute
+        now = time.time()
+        window_start = int(now // window_seconds * window_seconds)
+        window_end = window_start + window_seconds
+        counter = await db.rate_limits.find_one_and_update(
+            {"_id": f"{key}|{window_start}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expires_at": datetime.fromtimestamp(window_end, timezone.utc)}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if counter["count"] <= burst else window_end - now
+
+class RateLimiter:
+    """Checks the local bucket first so floods are rejected without I/O, then the optional shared backend"""
+    
+    def __init__(self, rules: Dict[tuple, tuple], local: InMemoryRateLimitBackend, shared=None):
+        self.rules = rules
+        self.local = local
+        self.shared = shared
+        self.rejected: Dict[tuple, int] = {}
+    
+    @staticmethod
+    def client_ip(scope) -> str:
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+    
+    async def check(self, scope) -> float:
+        """Seconds the caller must wait, or 0 when the request is admitted"""
+        route = (scope["method"], scope["path"].rstrip("/") or "/")
+        rule = self.rules.get(route)
+        if rule is None:
+            return 0.0
+        per_minute, burst = rule
+        key = f"{route[0]} {route[1]}|{self.client_ip(scope)}"
+        retry_after = await self.local.acquire(key, per_minute, burst)
+        if not retry_after and self.shared is not None:
+            try:
+                retry_after = await self.shared.acquire(key, per_minute, burst)
+            except Exception as e:
+                # Fail open on the shared counter; the local bucket still applies
+                logger.warning(f"Shared rate limit check failed: {str(e)}")
+        if retry_after:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+        return retry_after
+
+class RateLimitMiddleware:
+    """Pure ASGI admission control: answers 429 before the body is read or validated"""
+    
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        retry_after = await self.limiter.check(scope)
+        if retry_after:
+            response = JSONResponse(
+                {"detail": "Too many requests, please try again later"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+rate_limiter = RateLimiter(
+    load_rate_limits(),
+    InMemoryRateLimitBackend(int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))),
+    shared=MongoRateLimitBackend() if os.environ.get('RATE_LIMIT_BACKEND', 'memory') == 'mongo' else None
+)
+
+# Payment Reconciliation
+class PaymentReconciler:
+    """Settles transactions whose customer never came back to the status page and whose webhook
+    was missed: checks them against Stripe on a schedule and writes the changes in one bulk_write"""
+    
+    # Statuses Stripe may still move forward; "pending" means nobody has asked Stripe yet
+    OPEN_PAYMENT_STATUSES = ["pending", "unpaid"]
+    
+    def __init__(self, interval: float, min_age: float, max_age: float, max_sessions: int,
+                 max_concurrency: int, per_minute: float, burst: int, base_url: str):
+        self.interval = interval
+        self.min_age = min_age
+        self.max_age = max_age
+        self.max_sessions = max_sessions
+        self.max_concurrency = max_concurrency
+        self.per_minute = per_minute
+        self.burst = burst
+        self.base_url = base_url
+        # Same token bucket as the public rate limiter, spent on Stripe calls instead of requests
+        self._budget = InMemoryRateLimitBackend(1)
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def pending_sessions(self) -> List[str]:
+        now = datetime.now(timezone.utc)
+        transactions = await db.payment_transactions.find(
+            {
+                "payment_status": {"$in": self.OPEN_PAYMENT_STATUSES},
+                "created_at": {"$gte": now - timedelta(seconds=self.max_age), "$lt": now - timedelta(seconds=self.min_age)},
+                "checkout_status": {"$exists": False}
+            },
+            {"_id": 0, "session_id": 1}
+        ).sort("created_at", ASCENDING).limit(self.max_sessions).to_list(self.max_sessions)
+        return [transaction["session_id"] for transaction in transactions]
+    
+    async def _check(self, session_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            while True:
+                wait = await self._budget.acquire("stripe", self.per_minute, self.burst)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+            try:
+                checkout_status = await get_stripe_checkout(self.base_url).get_checkout_status(session_id)
+            except Exception as e:
+                logger.warning(f"Reconciliation check failed for session {session_id}: {str(e)}")
+                return None
+            return checkout_status_response(session_id, checkout_status)
+    
+    async def reconcile(self) -> Dict[str, Any]:
+        """Check every open transaction in the window once; returns a run summary"""
+        started = time.perf_counter()
+        session_ids = await self.pending_sessions()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        statuses = await asyncio.gather(*(self._check(session_id, semaphore) for session_id in session_ids))
+        
+        checked = [status for status in statuses if status is not None]
+        updated = 0
+        if checked:
+            result = await db.payment_transactions.bulk_write(
+                [UpdateOne(*checkout_status_update(status)) for status in checked],
+                ordered=False
+            )
+            updated = result.modified_count
+        
+        self.last_run = {
+            "checked": len(checked),
+            "failed": len(session_ids) - len(checked),
+            "updated": updated,
+            "paid": sum(1 for status in checked if status["payment_status"] == "paid"),
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat()
+        }
+        if session_ids:
+            logger.info(f"Payment reconciliation: {self.last_run}")
+        return self.last_run
+    
+    async def _claim_run(self) -> bool:
+        """Lease the next run so only one worker reconciles per interval"""
+        now = datetime.now(timezone.utc)
+        try:
+            await db.job_leases.find_one_and_update(
+                {"_id": "payment_reconciler", "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"lease_until": now + timedelta(seconds=self.interval * 0.9)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if await self._claim_run():
+                    await self.reconcile()
+            except Exception as e:
+                logger.error(f"Payment reconciliation failed: {str(e)}")
+
+payment_reconciler = PaymentReconciler(
+    interval=float(os.environ.get('RECONCILE_INTERVAL', '300')),
+    min_age=float(os.environ.get('RECONCILE_MIN_AGE', '600')),
+    max_age=float(os.environ.get('RECONCILE_MAX_AGE', str(48 * 3600))),
+    max_sessions=int(os.environ.get('RECONCILE_MAX_SESSIONS', '500')),
+    max_concurrency=int(os.environ.get('RECONCILE_MAX_CONCURRENCY', '4')),
+    per_minute=float(os.environ.get('RECONCILE_STRIPE_PER_MINUTE', '300')),
+    burst=int(os.environ.get('RECONCILE_STRIPE_BURST', '20')),
+    base_url=PUBLIC_BASE_URL or 'http://localhost:8001'
+)
+
+# Dependency Health
+class HealthProber:
+    """Probes dependencies on an interval so health endpoints only read cached results"""
+    
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.services: Dict[str, Any] = {"database": "unknown", "stripe": "unknown"}
+        self.database_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+    
+    async def probe(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), timeout=self.timeout)
+            database = "connected"
+            self.database_latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_error = None
+        except Exception as e:
+            database = "unreachable"
+            self.database_latency_ms = None
+            self.last_error = str(e) or type(e).__name__
+            logger.warning(f"Database health probe failed: {self.last_error}")
+        
+        self.services = {
+            "database": database,
+            "stripe": "configured" if stripe_api_key else "not_configured"
+        }
+        self.checked_at = datetime.now(timezone.utc)
+    
+    @property
+    def ready(self) -> bool:
+        # A prober that stopped reporting is treated like a failed probe
+        if self.checked_at is None:
+            return False
+        age = (datetime.now(timezone.utc) - self.checked_at).total_seconds()
+        return self.services["database"] == "connected" and age < self.interval * 3
+    
+    async def run(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+    
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "healthy" if self.ready else "unhealthy",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "services": self.services,
+            "database_latency_ms": self.database_latency_ms,
+            "error": self.last_error
+        }
+
+health_prober = HealthProber(
+    interval=float(os.environ.get('HEALTH_PROBE_INTERVAL', '10')),
+    timeout=float(os.environ.get('HEALTH_PROBE_TIMEOUT', '2'))
+)
 
 # Basic Health Routes
 @api_router.get("/")
@@ -151,72 +1653,222 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "services": {
-            "database": "connected",
-            "stripe": "configured" if stripe_api_key else "not_configured"
+    """Last dependency probe results; never touches the database itself"""
+    return health_prober.report()
+
+@api_router.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Readiness: 503 until the background probe has reached the database recently"""
+    report = health_prober.report()
+    return JSONResponse(status_code=200 if health_prober.ready else 503, content=report)
+
+@api_router.get("/health/startup")
+async def startup_timing():
+    """Cold start report: import time, time to ready and to first request"""
+    return {**startup_report.as_dict(), "stripe_loaded": stripe_provider.loaded}
+
+# Service Catalog
+SERVICE_FIELDS = ("name", "price", "duration", "description")
+SERVICE_CATALOG_CACHE_CONTROL = f"public, max-age={os.environ.get('SERVICE_CATALOG_MAX_AGE', '300')}"
+
+class ServiceCatalog:
+    """Immutable snapshot of the service packages with pre-rendered JSON bodies and strong ETags"""
+    
+    def __init__(self, packages: Dict[str, Dict[str, Any]]):
+        self.packages = packages
+        self.listing = self._render({"services": packages, "total_services": len(packages)})
+        self.details = {
+            service_id: self._render({"service_id": service_id, "service_details": service})
+            for service_id, service in packages.items()
         }
-    }
+    
+    @staticmethod
+    def _render(payload: Dict[str, Any]) -> tuple:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+service_catalog = ServiceCatalog(SERVICE_PACKAGES)
+
+def catalog_response(request: Request, rendered: tuple) -> Response:
+    """Serve a pre-rendered catalog body, or 304 when the client already holds it"""
+    body, etag = rendered
+    headers = {"ETag": etag, "Cache-Control": SERVICE_CATALOG_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def load_service_packages(source: str) -> Dict[str, Dict[str, Any]]:
+    """Read service packages from SERVICE_CATALOG_PATH or the service_catalog collection"""
+    if source == "file":
+        catalog_path = os.environ.get('SERVICE_CATALOG_PATH', str(ROOT_DIR / 'services.json'))
+        packages = await asyncio.to_thread(lambda: json.loads(Path(catalog_path).read_text()))
+    else:
+        docs = await db.service_catalog.find({}, {"_id": 0}).to_list(None)
+        packages = {doc.pop("service_id"): doc for doc in docs}
+    
+    for service_id, service in packages.items():
+        missing_fields = [field for field in SERVICE_FIELDS if field not in service]
+        if missing_fields:
+            raise ValueError(f"Service {service_id} is missing fields: {missing_fields}")
+    if not packages:
+        raise ValueError(f"No services found in {source}")
+    return packages
+
+def swap_service_catalog(packages: Dict[str, Dict[str, Any]], origin: str) -> ServiceCatalog:
+    """Render a new catalog off to the side, then swap it in with a single assignment"""
+    global service_catalog, SERVICE_PACKAGES
+    catalog = ServiceCatalog(packages)
+    service_catalog = catalog
+    SERVICE_PACKAGES = catalog.packages
+    logger.info(f"Service catalog loaded from {origin}: {len(catalog.packages)} services, ETag {catalog.listing[1]}")
+    return catalog
+
+async def reload_service_catalog(source: str) -> ServiceCatalog:
+    return swap_service_catalog(await load_service_packages(source), source)
+
+class CatalogSync:
+    """Spreads catalog reloads to every worker: POST /api/services/reload publishes the packages to
+    catalog_state under a new version, and each worker polls that version and swaps in newer ones"""
+    
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def publish(self, packages: Dict[str, Dict[str, Any]], source: str) -> int:
+        state = await db.catalog_state.find_one_and_update(
+            {"_id": "service_catalog"},
+            {
+                "$inc": {"version": 1},
+                "$set": {"packages": packages, "source": source, "published_at": datetime.now(timezone.utc)}
+            },
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return state["version"]
+    
+    async def sync(self) -> bool:
+        """Swap in the published catalog if it is newer than this worker's; returns whether it was"""
+        state = await db.catalog_state.find_one({"_id": "service_catalog", "version": {"$gt": self.version}})
+        if state is None:
+            return False
+        swap_service_catalog(state["packages"], f"published version {state['version']}")
+        self.version = state["version"]
+        return True
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Service catalog sync failed: {str(e)}")
+
+catalog_sync = CatalogSync(float(os.environ.get('SERVICE_CATALOG_POLL_INTERVAL', '10')))
 
 # Service Information Routes
 @api_router.get("/services")
-async def get_services():
+async def get_services(request: Request):
     """Get all available beauty services"""
-    return {
-        "services": SERVICE_PACKAGES,
-        "total_services": len(SERVICE_PACKAGES)
-    }
+    return catalog_response(request, service_catalog.listing)
 
 @api_router.get("/services/{service_id}")
-async def get_service_details(service_id: str):
+async def get_service_details(service_id: str, request: Request):
     """Get details for a specific service"""
-    if service_id not in SERVICE_PACKAGES:
+    rendered = service_catalog.details.get(service_id)
+    if rendered is None:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    service = SERVICE_PACKAGES[service_id]
-    return {
-        "service_id": service_id,
-        "service_details": service
-    }
+    return catalog_response(request, rendered)
+
+@api_router.post("/services/reload")
+async def reload_services(source: Literal["file", "collection"] = "file"):
+    """Reload the service catalog from disk or MongoDB (admin endpoint); other workers
+    pick it up within SERVICE_CATALOG_POLL_INTERVAL seconds"""
+    try:
+        packages = await load_service_packages(source)
+    except Exception as e:
+        logger.error(f"Service catalog reload failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Catalog reload failed: {str(e)}")
+    
+    # Published first so every worker, this one included, serves the same versioned catalog
+    await catalog_sync.publish(packages, source)
+    await catalog_sync.sync()
+    return {"total_services": len(service_catalog.packages), "etag": service_catalog.listing[1], "version": catalog_sync.version}
 
 # Existing Lead Capture Endpoints
 @api_router.post("/leads")
 async def create_lead(lead_input: LeadCreate):
     """Create a new lead and generate a coupon code"""
-    # Check if email already exists
-    existing_lead = await db.leads.find_one({"email": lead_input.email})
+    for attempt in range(3):
+        # Take a prevalidated coupon code from the pool
+        coupon_code = await coupon_allocator.allocate()
+        
+        # Create lead document
+        lead = LeadResponse(
+            email=lead_input.email,
+            name=lead_input.name,
+            phone=lead_input.phone,
+            source=lead_input.source,
+            coupon_code=coupon_code
+        )
+        
+        # Convert to dict for MongoDB; the email comes from the upsert filter
+        doc = lead.model_dump(exclude={"email"})
+        
+        # Insert only if the email is new, returning whichever lead now owns it
+        try:
+            stored_lead = await db.leads.find_one_and_update(
+                {"email": lead_input.email},
+                {"$setOnInsert": doc},
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError as e:
+            # A concurrent upsert of the same email, or a code the registry missed; retry either way
+            if "coupon_code" not in (e.details or {}).get("keyPattern", {}):
+                coupon_allocator.release(coupon_code)
+            logger.warning(f"Lead insert for {lead_input.email} hit a duplicate key: {str(e)}")
+    else:
+        raise HTTPException(status_code=503, detail="Could not create lead, please retry")
     
-    if existing_lead:
+    if stored_lead["id"] != lead.id:
         # Return existing coupon if email already registered
+        coupon_allocator.release(coupon_code)
         return {
-            "id": existing_lead.get("id"),
-            "email": existing_lead.get("email"),
-            "name": existing_lead.get("name"),
-            "couponCode": existing_lead.get("coupon_code"),
-            "discount": existing_lead.get("discount", "15%"),
+            "id": stored_lead.get("id"),
+            "email": stored_lead.get("email"),
+            "name": stored_lead.get("name"),
+            "couponCode": stored_lead.get("coupon_code"),
+            "discount": stored_lead.get("discount", "15%"),
             "message": "Welcome back! Here's your existing coupon."
         }
     
-    # Generate new coupon code
-    coupon_code = generate_coupon_code()
-    
-    # Create lead document
-    lead = LeadResponse(
-        email=lead_input.email,
-        name=lead_input.name,
-        phone=lead_input.phone,
-        coupon_code=coupon_code
-    )
-    
-    # Convert to dict for MongoDB
-    doc = lead.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['expires_at'] = doc['expires_at'].isoformat()
-    
-    # Save to database
-    await db.leads.insert_one(doc)
+    lead_stats_cache.invalidate()
     
     logger.info(f"New lead created: {lead_input.email} with coupon {coupon_code}")
     
@@ -231,22 +1883,37 @@ async def create_lead(lead_input: LeadCreate):
     }
 
 @api_router.get("/leads")
-async def get_all_leads():
-    """Get all leads (admin endpoint)"""
-    leads = await db.leads.find({}, {"_id": 0}).to_list(1000)
-    return {"leads": leads, "total": len(leads)}
+async def get_all_leads(
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Get all leads, newest first (admin endpoint)"""
+    return await list_documents(db.leads, "leads", limit, after, format)
 
 @api_router.get("/leads/stats")
 async def get_lead_stats():
     """Get lead statistics"""
-    total_leads = await db.leads.count_documents({})
-    used_coupons = await db.leads.count_documents({"used": True})
-    
+    return await lead_stats_cache.get_or_compute("lead_stats", compute_lead_stats)
+
+async def compute_lead_stats():
+    """Count total, redeemed and recent leads in a single aggregation round trip"""
     # Get leads from last 7 days
-    seven_days_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-    recent_leads = await db.leads.count_documents({
-        "created_at": {"$gte": seven_days_ago}
-    })
+    seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    pipeline = [
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "used": [{"$match": {"used": True}}, {"$count": "count"}],
+            "recent": [{"$match": {"created_at": {"$gte": seven_days_ago}}}, {"$count": "count"}]
+        }}
+    ]
+    result = (await db.leads.aggregate(pipeline).to_list(1))[0]
+    
+    # $count emits no document for an empty match, so missing facets mean zero
+    total_leads, used_coupons, recent_leads = (
+        result[facet][0]["count"] if result[facet] else 0
+        for facet in ("total", "used", "recent")
+    )
     
     return {
         "totalLeads": total_leads,
@@ -255,6 +1922,127 @@ async def get_lead_stats():
         "conversionRate": f"{(used_coupons / total_leads * 100):.1f}%" if total_leads > 0 else "0%"
     }
 
+# Revenue Analytics
+@api_router.get("/analytics/revenue")
+async def get_revenue_analytics(
+    days: int = Query(30, ge=1, le=366),
+    end: Optional[str] = Query(None, description="Last day of the window (YYYY-MM-DD, UTC); defaults to today")
+):
+    """Paid revenue per package and per day, plus the lead-to-paid funnel by lead source"""
+    try:
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else datetime.now(timezone.utc).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="end must be a YYYY-MM-DD date")
+    
+    # Windows are whole UTC days, so every dashboard load for the same range shares a cache entry
+    try:
+        window_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        window_start = window_end - timedelta(days=days)
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="end and days must describe a window within years 1-9999")
+    return await revenue_analytics_cache.get_or_compute(
+        (window_start, window_end),
+        lambda: compute_revenue_analytics(window_start, window_end)
+    )
+
+async def compute_revenue_analytics(window_start: datetime, window_end: datetime) -> Dict[str, Any]:
+    window = {"$gte": window_start, "$lt": window_end}
+    paid = {"$match": {"payment_status": "paid"}}
+    revenue_pipeline = [
+        {"$match": {"created_at": window}},
+        {"$facet": {
+            "packages": [paid, {"$group": {
+                "_id": "$service_package", "revenue": {"$sum": "$amount"}, "transactions": {"$sum": 1}
+            }}],
+            "daily": [paid, {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "revenue": {"$sum": "$amount"},
+                "transactions": {"$sum": 1}
+            }}]
+        }}
+    ]
+    # Each lead in the window joins its checkouts through the customer_email index
+    funnel_pipeline = [
+        {"$match": {"created_at": window}},
+        {"$lookup": {
+            "from": "payment_transactions", "localField": "email", "foreignField": "customer_email", "as": "transactions"
+        }},
+        {"$project": {
+            "_id": 0,
+            "source": {"$ifNull": ["$source", "direct"]},
+            "used": {"$cond": ["$used", 1, 0]},
+            "checkout": {"$cond": [{"$gt": [{"$size": "$transactions"}, 0]}, 1, 0]},
+            "paid": {"$cond": [{"$in": ["paid", "$transactions.payment_status"]}, 1, 0]}
+        }},
+        {"$group": {
+            "_id": "$source",
+            "leads": {"$sum": 1},
+            "couponsUsed": {"$sum": "$used"},
+            "checkouts": {"$sum": "$checkout"},
+            "paid": {"$sum": "$paid"}
+        }}
+    ]
+    revenue, sources = await asyncio.gather(
+        db.payment_transactions.aggregate(revenue_pipeline).to_list(1),
+        db.leads.aggregate(funnel_pipeline).to_list(None)
+    )
+    revenue = revenue[0] if revenue else {"packages": [], "daily": []}
+    
+    by_package = sorted(
+        (
+            {
+                "servicePackage": row["_id"],
+                "name": SERVICE_PACKAGES.get(row["_id"], {}).get("name", row["_id"]),
+                "revenue": round(row["revenue"], 2),
+                "transactions": row["transactions"]
+            }
+            for row in revenue["packages"]
+        ),
+        key=lambda row: row["revenue"],
+        reverse=True
+    )
+    
+    # Days without sales are reported as zero so charts get a continuous series
+    daily_rows = {row["_id"]: row for row in revenue["daily"]}
+    daily = []
+    day = window_start
+    while day < window_end:
+        key = day.strftime("%Y-%m-%d")
+        row = daily_rows.get(key, {"revenue": 0.0, "transactions": 0})
+        daily.append({"date": key, "revenue": round(row["revenue"], 2), "transactions": row["transactions"]})
+        day += timedelta(days=1)
+    
+    def funnel_stage(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "leads": row["leads"],
+            "couponsUsed": row["couponsUsed"],
+            "checkouts": row["checkouts"],
+            "paid": row["paid"],
+            "conversionRate": f"{(row['paid'] / row['leads'] * 100):.1f}%" if row["leads"] > 0 else "0%"
+        }
+    
+    totals = {"leads": 0, "couponsUsed": 0, "checkouts": 0, "paid": 0}
+    for row in sources:
+        for stage in totals:
+            totals[stage] += row[stage]
+    
+    return {
+        "window": {"start": window_start.isoformat(), "end": window_end.isoformat(), "days": len(daily)},
+        "revenue": {
+            "total": round(sum(row["revenue"] for row in by_package), 2),
+            "transactions": sum(row["transactions"] for row in by_package),
+            "byPackage": by_package,
+            "daily": daily
+        },
+        "funnel": funnel_stage(totals),
+        "leadsBySource": sorted(
+            ({"source": row["_id"], **funnel_stage(row)} for row in sources),
+            key=lambda row: row["leads"],
+            reverse=True
+        ),
+        "computedAt": datetime.now(timezone.utc).isoformat()
+    }
+
 # Contact Form Endpoint
 @api_router.post("/contact")
 async def create_contact_form(contact_input: ContactFormCreate):
@@ -266,10 +2054,10 @@ async def create_contact_form(contact_input: ContactFormCreate):
         "phone": contact_input.phone,
         "message": contact_input.message,
         "status": "new",
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
-    await db.contact_forms.insert_one(contact_doc)
+    await write_buffers["contact_forms"].insert(contact_doc)
     
     logger.info(f"New contact form submission from {contact_input.email}")
     
@@ -278,18 +2066,305 @@ async def create_contact_form(contact_input: ContactFormCreate):
         "status": "success"
     }
 
-# Booking Endpoints
-@api_router.post("/bookings")
-async def create_booking(booking_input: BookingCreate):
-    """Create a new booking"""
-    if booking_input.service_package not in SERVICE_PACKAGES:
-        raise HTTPException(status_code=400, detail="Invalid service package")
+# Booking Availability
+BOOKING_DAY_START = os.environ.get('BOOKING_DAY_START', '09:00')
+BOOKING_DAY_END = os.environ.get('BOOKING_DAY_END', '20:00')
+SLOT_INTERVAL_MINUTES = int(os.environ.get('SLOT_INTERVAL_MINUTES', '15'))
+BOOKING_TIME_FORMATS = ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%I%p")
+
+class SlotConflictError(Exception):
+    pass
+
+def parse_booking_time(value: str) -> int:
+    """Minutes since midnight for times like '14:00', '2:00 PM' or '2pm'"""
+    for time_format in BOOKING_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip().upper(), time_format)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized preferred_time: {value!r}")
+
+BOOKING_DAY_START_MINUTES = parse_booking_time(BOOKING_DAY_START)
+BOOKING_DAY_END_MINUTES = parse_booking_time(BOOKING_DAY_END)
+
+def parse_booking_slot(service_package: str, preferred_date: str, preferred_time: str, new_booking: bool = True) -> Dict[str, Any]:
+    """Normalized {date, start, end} interval a booking occupies, in minutes since midnight.
+    New bookings must fall on a future date within opening hours and start on the
+    SLOT_INTERVAL_MINUTES grid, the granularity of booking_slots claims."""
+    try:
+        booking_date = datetime.strptime(preferred_date.strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Unrecognized preferred_date: {preferred_date!r} (expected YYYY-MM-DD)")
+    start = parse_booking_time(preferred_time)
+    end = start + SERVICE_PACKAGES[service_package]["duration"]
+    if new_booking:
+        if booking_date < datetime.now(timezone.utc).date():
+            raise ValueError(f"preferred_date is in the past: {preferred_date!r}")
+        if start < BOOKING_DAY_START_MINUTES or end > BOOKING_DAY_END_MINUTES:
+            raise ValueError(f"Booking must fit within opening hours {BOOKING_DAY_START}-{BOOKING_DAY_END}, "
+                             f"got {format_minutes(start)}-{format_minutes(end)}")
+        if start % SLOT_INTERVAL_MINUTES:
+            raise ValueError(f"preferred_time must be on a {SLOT_INTERVAL_MINUTES}-minute boundary, got {preferred_time!r}")
+    return {"date": booking_date.isoformat(), "start": start, "end": end}
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class DaySchedule:
+    """Booked intervals for one day, sorted by start, with a running max of end times"""
+    
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.booking_ids: List[str] = []
+        self._max_ends: List[int] = []
+    
+    def overlaps(self, start: int, end: int) -> bool:
+        # Intervals starting before `end` overlap iff the latest of their ends is after `start`
+        position = bisect.bisect_left(self.starts, end)
+        return position > 0 and self._max_ends[position - 1] > start
     
-    service_details = SERVICE_PACKAGES[booking_input.service_package]
+    def add(self, start: int, end: int, booking_id: str):
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.booking_ids.insert(position, booking_id)
+        self._rebuild_max_ends(position)
+    
+    def remove(self, booking_id: str):
+        if booking_id in self.booking_ids:
+            position = self.booking_ids.index(booking_id)
+            del self.starts[position], self.ends[position], self.booking_ids[position]
+            self._rebuild_max_ends(position)
+    
+    def _rebuild_max_ends(self, position: int):
+        del self._max_ends[position:]
+        running = self._max_ends[-1] if self._max_ends else 0
+        for end in self.ends[position:]:
+            running = max(running, end)
+            self._max_ends.append(running)
+
+class AvailabilityIndex:
+    """Interval index per day over the per-block claims in booking_slots.
     
-    booking = BookingResponse(
+    The unique (date, block) index on booking_slots is what makes reservations atomic across
+    workers, and it is the source of truth: a loaded day is served for day_ttl seconds and
+    reloaded once it expires or a local check or a claim conflicts, so bookings taken on other
+    workers are seen. Bookings from before slot claims existed are loaded once at startup.
+    """
+    
+    def __init__(self, day_start: int, day_end: int, step: int, day_ttl: float = 2.0, max_days: int = 366):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.step = step
+        self.days = TTLCache(day_ttl, max_entries=max_days)
+        # Bookings without slot claims, i.e. made before claims existed; they never change
+        self._unclaimed: Dict[str, List[tuple]] = {}
+        # day -> [lock, holders and waiters]; dropped once nobody is using it
+        self._locks: Dict[str, list] = {}
+    
+    @contextlib.asynccontextmanager
+    async def _day_lock(self, day: str):
+        entry = self._locks.setdefault(day, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[day]
+    
+    async def rebuild(self):
+        """Load upcoming, non-cancelled bookings that hold no slot claims and reset the loaded days"""
+        unclaimed: Dict[str, List[tuple]] = {}
+        today = datetime.now(timezone.utc).date().isoformat()
+        cursor = db.bookings.find(
+            {"preferred_date": {"$gte": today}, "status": {"$ne": "cancelled"}, "slot": {"$exists": False}},
+            {"_id": 0, "id": 1, "service_package": 1, "preferred_date": 1, "preferred_time": 1}
+        )
+        skipped = 0
+        async for booking in cursor:
+            try:
+                slot = parse_booking_slot(booking["service_package"], booking["preferred_date"], booking["preferred_time"], new_booking=False)
+            except (KeyError, ValueError):
+                skipped += 1
+                continue
+            unclaimed.setdefault(slot["date"], []).append((slot["start"], slot["end"], booking["id"]))
+        self._unclaimed = unclaimed
+        self.days.invalidate()
+        logger.info(f"Availability index rebuilt: {sum(len(day) for day in unclaimed.values())} bookings without slot claims "
+                    f"across {len(unclaimed)} days ({skipped} with unparseable times skipped)")
+    
+    async def refresh_days(self, days: List[str]) -> Dict[str, DaySchedule]:
+        """Rebuild days from booking_slots (through the (date, block) index) plus their unclaimed bookings"""
+        blocks: Dict[str, Dict[str, List[int]]] = {day: {} for day in days}
+        async for claim in db.booking_slots.find({"date": {"$in": days}}, {"_id": 0, "date": 1, "block": 1, "booking_id": 1}):
+            blocks[claim["date"]].setdefault(claim["booking_id"], []).append(claim["block"])
+        schedules = {}
+        for day in days:
+            schedule = schedules[day] = DaySchedule()
+            for start, end, booking_id in self._unclaimed.get(day, ()):
+                schedule.add(start, end, booking_id)
+            for booking_id, booking_blocks in blocks[day].items():
+                schedule.add(min(booking_blocks), max(booking_blocks) + self.step, booking_id)
+            self.days.set(day, schedule)
+        return schedules
+    
+    async def refresh_day(self, day: str) -> DaySchedule:
+        return (await self.refresh_days([day]))[day]
+    
+    async def available_slots(self, service_package: str, day: str) -> List[str]:
+        duration = SERVICE_PACKAGES[service_package]["duration"]
+        async with self._day_lock(day):
+            schedule = self.days.get(day)
+            if schedule is None:
+                schedule = await self.refresh_day(day)
+        return [
+            format_minutes(start)
+            for start in range(self.day_start, self.day_end - duration + 1, self.step)
+            if not schedule.overlaps(start, start + duration)
+        ]
+    
+    async def reserve(self, slot: Dict[str, Any], booking_id: str):
+        """Claim a slot for a booking, raising SlotConflictError if any part of it is taken"""
+        day, start, end = slot["date"], slot["start"], slot["end"]
+        async with self._day_lock(day):
+            schedule = self.days.get(day)
+            # The loaded day may predate another worker's release, so reload before rejecting
+            if schedule is None or schedule.overlaps(start, end):
+                schedule = await self.refresh_day(day)
+                if schedule.overlaps(start, end):
+                    raise SlotConflictError(f"{day} {format_minutes(start)}-{format_minutes(end)} is already booked")
+            
+            claims = [
+                {"date": day, "block": block, "booking_id": booking_id}
+                for block in range(start - start % self.step, end, self.step)
+            ]
+            try:
+                await db.booking_slots.insert_many(claims, ordered=True)
+            except BulkWriteError:
+                # Another worker holds part of this interval; drop any blocks we did claim and learn its bookings
+                await db.booking_slots.delete_many({"booking_id": booking_id})
+                await self.refresh_day(day)
+                raise SlotConflictError(f"{day} {format_minutes(start)}-{format_minutes(end)} is already booked")
+            schedule.add(start, end, booking_id)
+    
+    async def reserve_many(self, reservations: List[tuple]) -> Dict[int, str]:
+        """Claim many (slot, booking_id) pairs with one unordered insert, returning {position: error}
+        for the ones that conflict. Conflicts are found in memory first, reloading every day the
+        chunk touches at most once, so the database only settles races with other workers."""
+        days = list({slot["date"] for slot, _ in reservations})
+        schedules = {day: self.days.get(day) for day in days}
+        missing = [day for day, schedule in schedules.items() if schedule is None]
+        if missing:
+            schedules.update(await self.refresh_days(missing))
+        
+        accepted, conflicts = self._check_conflicts(reservations, schedules)
+        # A loaded day may predate another worker's release, so reload before rejecting
+        stale = list({reservations[position][0]["date"] for position in conflicts} - set(missing))
+        if stale:
+            schedules.update(await self.refresh_days(stale))
+            accepted, conflicts = self._check_conflicts(reservations, schedules)
+        
+        claims, claim_owners = [], []
+        for position in accepted:
+            slot, booking_id = reservations[position]
+            for block in range(slot["start"] - slot["start"] % self.step, slot["end"], self.step):
+                claims.append({"date": slot["date"], "block": block, "booking_id": booking_id})
+                claim_owners.append(position)
+        if not claims:
+            return conflicts
+        
+        lost = set()
+        try:
+            await db.booking_slots.insert_many(claims, ordered=False)
+        except BulkWriteError as e:
+            # Other workers hold these blocks; map each failed claim back to its booking
+            lost = {claim_owners[error["index"]] for error in e.details.get("writeErrors", [])}
+        except Exception:
+            # Part of the chunk may have been claimed; give it all back before failing
+            await db.booking_slots.delete_many({"booking_id": {"$in": [reservations[position][1] for position in accepted]}})
+            raise
+        
+        if lost:
+            await db.booking_slots.delete_many({"booking_id": {"$in": [reservations[position][1] for position in lost]}})
+            for position in lost:
+                slot = reservations[position][0]
+                conflicts[position] = f"{slot['date']} {format_minutes(slot['start'])}-{format_minutes(slot['end'])} is already booked"
+                self.days.invalidate(slot["date"])
+        for position in accepted:
+            slot, booking_id = reservations[position]
+            schedule = self.days.get(slot["date"])
+            if position not in lost and schedule is not None:
+                schedule.add(slot["start"], slot["end"], booking_id)
+        return conflicts
+    
+    @staticmethod
+    def _check_conflicts(reservations: List[tuple], schedules: Dict[str, DaySchedule]) -> tuple:
+        """Positions that fit the loaded days and each other, and {position: error} for the rest"""
+        accepted, conflicts = [], {}
+        claimed = {day: DaySchedule() for day in schedules}
+        for position, (slot, booking_id) in enumerate(reservations):
+            day, start, end = slot["date"], slot["start"], slot["end"]
+            if schedules[day].overlaps(start, end) or claimed[day].overlaps(start, end):
+                conflicts[position] = f"{day} {format_minutes(start)}-{format_minutes(end)} is already booked"
+                continue
+            claimed[day].add(start, end, booking_id)
+            accepted.append(position)
+        return accepted, conflicts
+    
+    async def release(self, slot: Dict[str, Any], booking_id: str):
+        await db.booking_slots.delete_many({"booking_id": booking_id})
+        schedule = self.days.get(slot["date"])
+        if schedule is not None:
+            schedule.remove(booking_id)
+    
+    async def release_many(self, docs: List[Dict[str, Any]]):
+        """Release the claims of many booking documents with one delete"""
+        await db.booking_slots.delete_many({"booking_id": {"$in": [doc["id"] for doc in docs]}})
+        for doc in docs:
+            schedule = self.days.get(doc["slot"]["date"])
+            if schedule is not None:
+                schedule.remove(doc["id"])
+
+availability_index = AvailabilityIndex(
+    day_start=BOOKING_DAY_START_MINUTES,
+    day_end=BOOKING_DAY_END_MINUTES,
+    step=SLOT_INTERVAL_MINUTES,
+    day_ttl=float(os.environ.get('AVAILABILITY_DAY_TTL', '2')),
+    max_days=int(os.environ.get('AVAILABILITY_MAX_DAYS', '366'))
+)
+
+@api_router.get("/availability")
+async def get_availability(service: str, date: str):
+    """Open start times for a service on a day"""
+    if service not in SERVICE_PACKAGES:
+        raise HTTPException(status_code=400, detail="Invalid service package")
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date (expected YYYY-MM-DD)")
+    
+    return {
+        "service": service,
+        "date": day,
+        "duration": SERVICE_PACKAGES[service]["duration"],
+        "slots": await availability_index.available_slots(service, day)
+    }
+
+# Booking Endpoints
+BOOKING_BATCH_INSERT_SIZE = int(os.environ.get('BOOKING_BATCH_INSERT_SIZE', '500'))
+BOOKING_BATCH_MAX_ITEMS = int(os.environ.get('BOOKING_BATCH_MAX_ITEMS', '5000'))
+BOOKING_BATCH_MAX_LINE_BYTES = int(os.environ.get('BOOKING_BATCH_MAX_LINE_BYTES', str(64 * 1024)))
+
+def build_booking(booking_input: BookingCreate, slot: Dict[str, Any]) -> BookingResponse:
+    """Booking document for an input whose service package and slot have already been validated"""
+    return BookingResponse(
+        slot=slot,
         service_package=booking_input.service_package,
-        service_details=service_details,
+        service_details=SERVICE_PACKAGES[booking_input.service_package],
         preferred_date=booking_input.preferred_date,
         preferred_time=booking_input.preferred_time,
         customer_name=booking_input.customer_name,
@@ -297,38 +2372,215 @@ async def create_booking(booking_input: BookingCreate):
         customer_phone=booking_input.customer_phone,
         special_requests=booking_input.special_requests
     )
+
+@api_router.post("/bookings")
+async def create_booking(booking_input: BookingCreate):
+    """Create a new booking"""
+    if booking_input.service_package not in SERVICE_PACKAGES:
+        raise HTTPException(status_code=400, detail="Invalid service package")
+    
+    try:
+        slot = parse_booking_slot(booking_input.service_package, booking_input.preferred_date, booking_input.preferred_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    booking = build_booking(booking_input, slot)
+    
+    try:
+        await availability_index.reserve(slot, booking.id)
+    except SlotConflictError as e:
+        raise HTTPException(status_code=409, detail=f"Requested time is not available: {str(e)}")
     
     # Convert to dict for MongoDB
     doc = booking.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
     
-    await db.bookings.insert_one(doc)
+    try:
+        await db.bookings.insert_one(doc)
+    except Exception:
+        await availability_index.release(slot, booking.id)
+        raise
     
     logger.info(f"New booking created: {booking_input.customer_email} for {booking_input.service_package}")
     
     return {
         "booking_id": booking.id,
-        "service": service_details["name"],
+        "service": booking.service_details["name"],
         "date": booking_input.preferred_date,
         "time": booking_input.preferred_time,
         "status": "pending_confirmation",
         "message": "Booking request submitted! We'll confirm your appointment shortly."
     }
 
+async def iter_batch_items(request: Request):
+    """Yield raw booking items from an NDJSON stream (line by line) or a JSON array body"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            # A body without newlines would otherwise be buffered whole
+            if len(buffer) > BOOKING_BATCH_MAX_LINE_BYTES or any(len(line) > BOOKING_BATCH_MAX_LINE_BYTES for line in lines):
+                raise HTTPException(status_code=413, detail=f"NDJSON lines must be at most {BOOKING_BATCH_MAX_LINE_BYTES} bytes")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+    
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    items = body.get("bookings") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of bookings or NDJSON")
+    for item in items:
+        yield item
+
+def describe_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in e.errors()
+    )
+
+@api_router.post("/bookings/batch")
+async def create_bookings_batch(request: Request):
+    """Create many bookings at once from a JSON array or an NDJSON upload (admin endpoint)"""
+    results = []
+    # (index, booking document) pairs validated but not yet claimed, then claimed but not yet written
+    staged: List[tuple] = []
+    pending: List[tuple] = []
+    
+    async def flush():
+        """Claim the staged bookings' slots, then write them with one unordered insert_many,
+        recording each item's outcome"""
+        conflicts = await availability_index.reserve_many([(doc["slot"], doc["id"]) for _, doc in staged])
+        for position, (index, doc) in enumerate(staged):
+            if position in conflicts:
+                results.append({"index": index, "status": "conflict", "error": conflicts[position]})
+            else:
+                pending.append((index, doc))
+        staged.clear()
+        if not pending:
+            return
+        
+        failed = {}
+        try:
+            await db.bookings.insert_many([doc for _, doc in pending], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "write failed") for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            # Network or timeout error: part of the chunk may still have been written, so ask which
+            logger.error(f"Booking batch insert failed: {str(e)}")
+            try:
+                written = {
+                    booking["id"] for booking in await db.bookings.find(
+                        {"id": {"$in": [doc["id"] for _, doc in pending]}}, {"_id": 0, "id": 1}
+                    ).to_list(len(pending))
+                }
+            except Exception:
+                written = set()
+            failed = {position: f"write failed: {str(e)}" for position, (_, doc) in enumerate(pending) if doc["id"] not in written}
+        if failed:
+            try:
+                await availability_index.release_many([pending[position][1] for position in failed])
+            except Exception as e:
+                logger.error(f"Could not release slot claims of {len(failed)} unwritten bookings: {str(e)}")
+        for position, (index, doc) in enumerate(pending):
+            if position in failed:
+                results.append({"index": index, "status": "failed", "error": failed[position]})
+            else:
+                results.append({"index": index, "status": "created", "booking_id": doc["id"]})
+        pending.clear()
+    
+    try:
+        index = -1
+        async for item in iter_batch_items(request):
+            index += 1
+            if index >= BOOKING_BATCH_MAX_ITEMS:
+                results.append({"index": index, "status": "rejected", "error": f"Batch limit of {BOOKING_BATCH_MAX_ITEMS} bookings reached"})
+                break
+            try:
+                if isinstance(item, bytes):
+                    booking_input = BookingCreate.model_validate_json(item)
+                else:
+                    booking_input = BookingCreate.model_validate(item)
+            except ValidationError as e:
+                results.append({"index": index, "status": "invalid", "error": describe_validation_error(e)})
+                continue
+            if booking_input.service_package not in SERVICE_PACKAGES:
+                results.append({"index": index, "status": "invalid", "error": "Invalid service package"})
+                continue
+            try:
+                slot = parse_booking_slot(booking_input.service_package, booking_input.preferred_date, booking_input.preferred_time)
+            except ValueError as e:
+                results.append({"index": index, "status": "invalid", "error": str(e)})
+                continue
+            
+            staged.append((index, build_booking(booking_input, slot).model_dump()))
+            if len(staged) >= BOOKING_BATCH_INSERT_SIZE:
+                await flush()
+        
+        if staged:
+            await flush()
+    
+    except BaseException:
+        # Claims are taken before their bookings are written; an aborted upload must not leave them behind
+        unwritten = [doc for _, doc in staged + pending]
+        if unwritten:
+            try:
+                await availability_index.release_many(unwritten)
+            except Exception as e:
+                logger.error(f"Could not release slot claims of {len(unwritten)} unwritten bookings: {str(e)}")
+        raise
+    
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    logger.info(f"Booking batch processed: {created} created, {len(results) - created} rejected")
+    
+    return {
+        "results": results,
+        "created": created,
+        "failed": len(results) - created
+    }
+
 @api_router.get("/bookings")
-async def get_all_bookings():
-    """Get all bookings (admin endpoint)"""
-    bookings = await db.bookings.find({}, {"_id": 0}).to_list(1000)
-    return {"bookings": bookings, "total": len(bookings)}
+async def get_all_bookings(
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Get all bookings, newest first (admin endpoint)"""
+    return await list_documents(db.bookings, "bookings", limit, after, format)
 
 # Stripe Payment Endpoints
 @api_router.post("/payments/checkout")
-async def create_payment_checkout(payment_request: PaymentRequest, request: Request):
+async def create_payment_checkout(payment_request: PaymentRequest, request: Request, response: Response):
     """Create Stripe checkout session for service payment"""
     if payment_request.service_package not in SERVICE_PACKAGES:
         raise HTTPException(status_code=400, detail="Invalid service package")
     
+    base_url = public_base_url(request)
+    
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if not idempotency_key:
+        return await start_checkout(payment_request, base_url)
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+    
+    # Retries and double-clicks with the same key share one Stripe session
+    checkout, replayed = await idempotency_store.run(
+        f"checkout:{idempotency_key}",
+        IdempotencyStore.fingerprint(payment_request.model_dump()),
+        lambda: start_checkout(payment_request, base_url)
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return checkout
+
+async def start_checkout(payment_request: PaymentRequest, base_url: str) -> Dict[str, Any]:
     service = SERVICE_PACKAGES[payment_request.service_package]
     
     # Calculate amount (handle unit-based services like botox)
@@ -339,9 +2591,6 @@ async def create_payment_checkout(payment_request: PaymentRequest, request: Requ
         amount = service["price"]
         description = service["name"]
     
-    # Get base URL from request
-    base_url = str(request.base_url).rstrip('/')
-    
     # Create success and cancel URLs
     success_url = payment_request.success_url or f"{base_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = payment_request.cancel_url or f"{base_url}/payment/cancel"
@@ -351,7 +2600,7 @@ async def create_payment_checkout(payment_request: PaymentRequest, request: Requ
         stripe_checkout = get_stripe_checkout(base_url)
         
         # Create checkout session
-        checkout_request = CheckoutSessionRequest(
+        checkout_request = stripe_provider.session_request(
             amount=amount,
             currency="usd",
             success_url=success_url,
@@ -365,7 +2614,7 @@ async def create_payment_checkout(payment_request: PaymentRequest, request: Requ
             }
         )
         
-        session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
+        session: "CheckoutSessionResponse" = await stripe_checkout.create_checkout_session(checkout_request)
         
         # Create payment transaction record
         transaction = PaymentTransactionCreate(
@@ -384,8 +2633,6 @@ async def create_payment_checkout(payment_request: PaymentRequest, request: Requ
         
         # Store in database
         transaction_doc = transaction.model_dump()
-        transaction_doc['created_at'] = transaction_doc['created_at'].isoformat()
-        transaction_doc['updated_at'] = transaction_doc['updated_at'].isoformat()
         
         await db.payment_transactions.insert_one(transaction_doc)
         
@@ -407,47 +2654,34 @@ async def create_payment_checkout(payment_request: PaymentRequest, request: Requ
 async def get_payment_status(session_id: str, request: Request):
     """Get payment status for a checkout session"""
     try:
-        base_url = str(request.base_url).rstrip('/')
-        stripe_checkout = get_stripe_checkout(base_url)
+        cached_status = payment_status_cache.get(session_id)
+        if cached_status is not None:
+            return cached_status
         
-        # Get status from Stripe
-        checkout_status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
-        
-        # Update local transaction record
-        transaction = await db.payment_transactions.find_one({"session_id": session_id})
-        
-        if transaction and transaction["payment_status"] != checkout_status.payment_status:
-            # Update only if status has changed to avoid duplicate processing
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {
-                    "$set": {
-                        "payment_status": checkout_status.payment_status,
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }
-                }
-            )
-            
-            logger.info(f"Payment status updated for session {session_id}: {checkout_status.payment_status}")
+        # Finished sessions are answered from the stored snapshot without calling Stripe
+        transaction = await db.payment_transactions.find_one(
+            {"session_id": session_id},
+            {"_id": 0, "checkout_status": 1}
+        )
+        if transaction and transaction.get("checkout_status"):
+            payment_status_cache.set(session_id, transaction["checkout_status"])
+            return transaction["checkout_status"]
         
-        return {
-            "session_id": session_id,
-            "status": checkout_status.status,
-            "payment_status": checkout_status.payment_status,
-            "amount_total": checkout_status.amount_total,
-            "currency": checkout_status.currency,
-            "metadata": checkout_status.metadata
-        }
+        base_url = public_base_url(request)
+        return await refresh_checkout_status(session_id, base_url)
         
     except Exception as e:
         logger.error(f"Payment status check failed for {session_id}: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Payment status check failed: {str(e)}")
 
 @api_router.get("/payments/transactions")
-async def get_payment_transactions():
-    """Get all payment transactions (admin endpoint)"""
-    transactions = await db.payment_transactions.find({}, {"_id": 0}).to_list(1000)
-    return {"transactions": transactions, "total": len(transactions)}
+async def get_payment_transactions(
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Get all payment transactions, newest first (admin endpoint)"""
+    return await list_documents(db.payment_transactions, "transactions", limit, after, format)
 
 # Stripe Webhook Endpoint
 @api_router.post("/webhook/stripe")
@@ -460,25 +2694,14 @@ async def stripe_webhook(request: Request):
         if not signature:
             raise HTTPException(status_code=400, detail="Missing Stripe signature")
         
-        base_url = str(request.base_url).rstrip('/')
+        base_url = public_base_url(request)
         stripe_checkout = get_stripe_checkout(base_url)
         
-        # Handle webhook
+        # Verify the signature, then queue the event; the transaction update happens in webhook_queue
         webhook_response = await stripe_checkout.handle_webhook(body, signature)
         
-        logger.info(f"Webhook processed: {webhook_response.event_type} for session {webhook_response.session_id}")
-        
-        # Update transaction based on webhook
-        if webhook_response.session_id:
-            await db.payment_transactions.update_one(
-                {"session_id": webhook_response.session_id},
-                {
-                    "$set": {
-                        "payment_status": webhook_response.payment_status,
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }
-                }
-            )
+        if await webhook_queue.enqueue(webhook_response, body):
+            logger.info(f"Webhook queued: {webhook_response.event_type} for session {webhook_response.session_id}")
         
         return {"status": "success"}
         
@@ -486,34 +2709,339 @@ async def stripe_webhook(request: Request):
         logger.error(f"Webhook processing failed: {str(e)}")
         raise HTTPException(status_code=400, detail="Webhook processing failed")
 
+@api_router.post("/payments/reconcile")
+async def reconcile_payments():
+    """Check open transactions against Stripe now instead of waiting for the schedule (admin endpoint)"""
+    return await payment_reconciler.reconcile()
+
+@api_router.get("/payments/reconcile")
+async def get_reconciliation_status():
+    """Summary of the last reconciliation run in this process (admin endpoint)"""
+    return {"interval_seconds": payment_reconciler.interval, "last_run": payment_reconciler.last_run}
+
+@api_router.get("/webhook/stripe/queue")
+async def get_webhook_queue_metrics():
+    """Webhook queue depth and processing lag (admin endpoint)"""
+    return await webhook_queue.metrics()
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for this process"""
+    lines = []
+    for name, seconds in (
+        ("process_import_seconds", startup_report.imported_at),
+        ("process_startup_seconds", startup_report.startup_complete_at),
+        ("process_first_request_seconds", startup_report.first_request_at),
+    ):
+        if seconds is not None:
+            lines.extend([f"# TYPE {name} gauge", f"{name} {seconds:.6f}"])
+    lines.append("# TYPE http_requests_rate_limited_total counter")
+    for (method, route), count in sorted(rate_limiter.rejected.items()):
+        lines.append(f'http_requests_rate_limited_total{{method="{method}",route="{route}"}} {count}')
+    buffer_stats = {name: buffer.stats() for name, buffer in write_buffers.items()}
+    for stat in ("pending", "flushed_total", "sync_writes_total", "failed_flushes_total"):
+        lines.append(f"# TYPE write_behind_{stat} {'gauge' if stat == 'pending' else 'counter'}")
+        for name, values in buffer_stats.items():
+            lines.append(f'write_behind_{stat}{{collection="{name}"}} {values[stat]}')
+    body = metrics.render() + "\n".join(lines) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+# Admin Change Feed
+# Collection -> SSE event name
+CHANGE_FEED_COLLECTIONS = {"leads": "lead", "bookings": "booking", "payment_transactions": "payment"}
+CHANGE_FEED_PIPELINE = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+# Server error codes: change streams need a replica set; the resume point fell off the oplog
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = (136, 280, 286)
+
+class ResumeTokenLost(Exception):
+    pass
+
+def change_event(collection_name: str, change: Dict[str, Any]) -> Dict[str, Any]:
+    document = change.get("fullDocument") or {}
+    document.pop("_id", None)
+    return {
+        "token": change["_id"]["_data"],
+        "collection": collection_name,
+        "operation": change["operationType"],
+        "id": document.get("id"),
+        "document": document
+    }
+
+class ChangeSubscriber:
+    """One connected client; its queue is fed by every collection it follows"""
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+class SharedChangeStream:
+    """A single change stream on one collection, fanned out to every subscriber.
+    Recent events stay in a ring buffer so reconnecting clients can catch up without a new stream."""
+    
+    def __init__(self, collection_name: str, replay_size: int, retry_interval: float):
+        self.collection_name = collection_name
+        self.retry_interval = retry_interval
+        self.recent: deque = deque(maxlen=replay_size)
+        self.subscribers: set = set()
+        self.resume_token: Optional[Dict[str, Any]] = None
+        self.supported = True
+        self._task: Optional[asyncio.Task] = None
+    
+    def subscribe(self, subscriber: ChangeSubscriber):
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    def unsubscribe(self, subscriber: ChangeSubscriber):
+        self.subscribers.discard(subscriber)
+    
+    def replay_since(self, token: str) -> Optional[List[Dict[str, Any]]]:
+        """Events after token, or None when the token is no longer (or never was) buffered"""
+        for index, event in enumerate(self.recent):
+            if event["token"] == token:
+                return list(self.recent)[index + 1:]
+        return None
+    
+    def _publish(self, event: Dict[str, Any]):
+        self.recent.append(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, it reconnects with Last-Event-ID and catches up
+                subscriber.overflowed = True
+                self._disconnect(subscriber)
+    
+    def _disconnect(self, subscriber: ChangeSubscriber):
+        self.subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+    
+    async def _run(self):
+        while True:
+            try:
+                async with db[self.collection_name].watch(
+                    CHANGE_FEED_PIPELINE, full_document="updateLookup", resume_after=self.resume_token
+                ) as stream:
+                    async for change in stream:
+                        self.resume_token = change["_id"]
+                        self._publish(change_event(self.collection_name, change))
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                    logger.error(f"Change feed disabled: {str(e)}")
+                    self.supported = False
+                    for subscriber in list(self.subscribers):
+                        self._disconnect(subscriber)
+                    self._task = None
+                    return
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    # Restart from now; clients holding older positions will be told to reload
+                    self.resume_token = None
+                    self.recent.clear()
+                logger.warning(f"Change stream on {self.collection_name} failed: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Change stream on {self.collection_name} failed: {str(e)}")
+            await asyncio.sleep(self.retry_interval)
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class ChangeFeed:
+    """Server-sent events over the shared change streams.
+    Each SSE id encodes the last resume token of every followed collection, so one
+    Last-Event-ID restores the position in all of them."""
+    
+    def __init__(self, replay_size: int, queue_size: int, heartbeat_interval: float, retry_interval: float):
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self.streams = {
+            name: SharedChangeStream(name, replay_size, retry_interval) for name in CHANGE_FEED_COLLECTIONS
+        }
+    
+    @property
+    def supported(self) -> bool:
+        return all(stream.supported for stream in self.streams.values())
+    
+    @staticmethod
+    def encode_position(positions: Dict[str, Optional[str]]) -> str:
+        known = {name: token for name, token in positions.items() if token}
+        return base64.urlsafe_b64encode(orjson.dumps(known)).decode("ascii")
+    
+    @staticmethod
+    def decode_position(value: Optional[str]) -> Dict[str, str]:
+        if not value:
+            return {}
+        try:
+            positions = orjson.loads(base64.urlsafe_b64decode(value.encode("ascii")))
+        except (ValueError, TypeError):
+            return {}
+        if not isinstance(positions, dict):
+            return {}
+        return {name: token for name, token in positions.items() if name in CHANGE_FEED_COLLECTIONS and isinstance(token, str)}
+    
+    def _message(self, event_name: str, positions: Dict[str, Optional[str]], data: Dict[str, Any]) -> bytes:
+        return (
+            f"id: {self.encode_position(positions)}\nevent: {event_name}\ndata: ".encode()
+            + orjson.dumps(data, option=orjson.OPT_NAIVE_UTC)
+            + b"\n\n"
+        )
+    
+    async def _resume(self, collection_name: str, token: str):
+        """Private change stream from an unbuffered position, read until it has caught up with now"""
+        try:
+            async with db[collection_name].watch(
+                CHANGE_FEED_PIPELINE, full_document="updateLookup", resume_after={"_data": token}, max_await_time_ms=200
+            ) as stream:
+                while True:
+                    change = await stream.try_next()
+                    if change is None:
+                        return
+                    yield change_event(collection_name, change)
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAM_HISTORY_LOST:
+                raise ResumeTokenLost(collection_name)
+            raise
+    
+    async def events(self, collections: List[str], last_event_id: Optional[str]):
+        subscriber = ChangeSubscriber(self.queue_size)
+        # Subscribe before catching up so nothing published meanwhile is missed; duplicates are skipped
+        for name in collections:
+            self.streams[name].subscribe(subscriber)
+        try:
+            requested = self.decode_position(last_event_id)
+            positions: Dict[str, Optional[str]] = {}
+            for name in collections:
+                current = self.streams[name].resume_token
+                positions[name] = requested.get(name) or (current["_data"] if current else None)
+            yield self._message("ready", positions, {"collections": collections})
+            
+            delivered = set()
+            for name in collections:
+                token = requested.get(name)
+                if token is None:
+                    continue
+                missed = self.streams[name].replay_since(token)
+                try:
+                    if missed is None:
+                        missed = [event async for event in self._resume(name, token)]
+                except ResumeTokenLost:
+                    yield self._message("reset", positions, {"collection": name, "reason": "resume point expired, reload"})
+                    continue
+                for event in missed:
+                    delivered.add(event["token"])
+                    positions[name] = event["token"]
+                    yield self._message(CHANGE_FEED_COLLECTIONS[name], positions, event)
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                if event["token"] in delivered:
+                    continue
+                positions[event["collection"]] = event["token"]
+                yield self._message(CHANGE_FEED_COLLECTIONS[event["collection"]], positions, event)
+        finally:
+            for name in collections:
+                self.streams[name].unsubscribe(subscriber)
+    
+    async def stop(self):
+        for stream in self.streams.values():
+            await stream.stop()
+
+change_feed = ChangeFeed(
+    replay_size=int(os.environ.get('CHANGE_FEED_REPLAY_SIZE', '1000')),
+    queue_size=int(os.environ.get('CHANGE_FEED_QUEUE_SIZE', '1000')),
+    heartbeat_interval=float(os.environ.get('CHANGE_FEED_HEARTBEAT', '15')),
+    retry_interval=float(os.environ.get('CHANGE_FEED_RETRY_INTERVAL', '5'))
+)
+
+@api_router.get("/admin/events")
+async def admin_events(
+    request: Request,
+    collections: Optional[str] = Query(None, description="Comma-separated subset of leads, bookings, payment_transactions"),
+    last_event_id: Optional[str] = Query(None, description="Resume position, for clients that cannot set Last-Event-ID")
+):
+    """Server-sent events for new and updated leads, bookings and payments (admin endpoint)"""
+    followed = collections.split(",") if collections else list(CHANGE_FEED_COLLECTIONS)
+    unknown = [name for name in followed if name not in CHANGE_FEED_COLLECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(unknown)}")
+    if not change_feed.supported:
+        raise HTTPException(status_code=503, detail="Change feed requires MongoDB running as a replica set")
+    
+    position = request.headers.get("Last-Event-ID") or last_event_id
+    return StreamingResponse(
+        change_feed.events(followed, position),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Analytics Exports
+# exports pulls in pyarrow, so it is imported by these admin routes rather than at startup
+@api_router.get("/exports")
+async def get_exports():
+    """Watermark and last run of each export dataset (admin endpoint)"""
+    from exports import export_status
+    return {"exports": await export_status(db)}
+
+@api_router.post("/exports/{dataset}")
+async def create_export(dataset: str, format: Literal["parquet", "arrow"] = "parquet"):
+    """Write rows added since the previous export to a new columnar file (admin endpoint)"""
+    from exports import EXPORT_DATASETS, ExportInProgressError, run_export
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail="Export dataset not found")
+    try:
+        return await run_export(db, dataset, format)
+    except ExportInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 # Status Check Routes (existing)
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
+    # Timestamps are stored as native BSON dates
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     
-    _ = await db.status_checks.insert_one(doc)
+    await write_buffers["status_checks"].insert(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+async def get_status_checks(
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    if format == "ndjson":
+        return stream_ndjson(db.status_checks, "timestamp", limit, after)
     
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    # The body is a bare list, so the next-page cursor travels in a header
+    status_checks, next_cursor = await fetch_page(db.status_checks, "timestamp", limit, after)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
     
-    return status_checks
+    # Stored documents already match StatusCheck, so bypass response_model re-validation
+    return FastJSONResponse(status_checks, headers=headers)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside CORS so 429 responses still carry CORS headers
+if os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true':
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -522,6 +3050,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -531,11 +3062,62 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    global client, db
+    for task in list(background_tasks):
+        task.cancel()
+    await webhook_queue.stop()
+    await payment_reconciler.stop()
+    await change_feed.stop()
+    # Flush buffered inserts before the client goes away
+    for buffer in write_buffers.values():
+        await buffer.stop()
+    await catalog_sync.stop()
+    stripe_clients.close()
+    if client is not None:
+        client.close()
+        client = db = None
 
 # Add startup event
 @app.on_event("startup")
 async def startup_event():
+    global client, db
     logger.info("Snatched Beauties API v2.0 started")
     logger.info(f"Stripe configured: {stripe_api_key is not None}")
-    logger.info(f"Available services: {len(SERVICE_PACKAGES)}")
\ No newline at end of file
+    logger.info(f"Available services: {len(SERVICE_PACKAGES)}")
+    
+    # A client assigned before startup (e.g. by the benchmark) is used as is
+    if client is None:
+        client = create_mongo_client()
+        db = client[os.environ['DB_NAME']]
+    
+    if os.environ.get('STRIPE_PRELOAD', 'false').lower() == 'true':
+        # Instances that mostly take payments load the integration before serving
+        stripe_provider.load()
+        stripe_clients.start()
+    
+    catalog_source = os.environ.get('SERVICE_CATALOG_SOURCE')
+    if catalog_source:
+        await reload_service_catalog(catalog_source)
+    # A catalog published through POST /api/services/reload takes precedence over the startup source
+    await catalog_sync.sync()
+    catalog_sync.start()
+    
+    await ensure_indexes()
+    if os.environ.get('VERIFY_QUERY_PLANS', 'false').lower() == 'true':
+        # Refuse to start when a route would collection-scan
+        await verify_query_plans()
+        logger.info("Query plan check passed: every route query uses an index")
+    
+    await availability_index.rebuild()
+    start_background_task(health_prober.run())
+    start_background_task(migrate_datetime_fields())
+    start_background_task(coupon_allocator.seed_issued_codes())
+    await coupon_allocator.refill()
+    webhook_queue.start()
+    if os.environ.get('RECONCILE_ENABLED', 'true').lower() == 'true':
+        payment_reconciler.start()
+    for buffer in write_buffers.values():
+        buffer.start()
+    
+    startup_report.mark_startup_complete()
+    logger.info(f"Startup complete: {startup_report.summary()}")
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Cold start timing: module import cost, startup hook duration and time to first request.
+
+server.py imports this module before anything else so the clock starts ahead of the
+heavy imports. With STARTUP_IMPORT_PROFILE=true in the process environment (backend/.env
+is loaded too late for this) each top-level package import is timed as well.
+"""
+import importlib.abc
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+STARTED = time.perf_counter()
+
+class _TimedLoader:
+    """Wraps a module's loader for the duration of its exec_module call"""
+
+    def __init__(self, loader, fullname: str, timer: "ImportTimer"):
+        self._loader = loader
+        self._fullname = fullname
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module its real loader back before it runs, so nothing sees the wrapper
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.record(self._fullname, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder timing top-level package imports, including what they pull in"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._resolving = False
+
+    def find_spec(self, fullname, path, target=None):
+        # Only packages (not their submodules), and never while resolving one ourselves
+        if "." in fullname or self._resolving:
+            return None
+        self._resolving = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._resolving = False
+        # Builtin and frozen importers are shared classes; only per-module loader instances are wrapped
+        if spec.loader is None or isinstance(spec.loader, type) or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def record(self, fullname: str, seconds: float):
+        self.timings[fullname] = seconds
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+class StartupReport:
+    """Milestones of this process's cold start, in seconds since server.py began importing"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.imported_at: Optional[float] = None
+        self.startup_complete_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+        self.import_timer: Optional[ImportTimer] = None
+        # Modules loaded on first use, e.g. the payment stack
+        self.lazy_imports: Dict[str, float] = {}
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark_imported(self):
+        self.imported_at = self._elapsed()
+
+    def mark_startup_complete(self):
+        self.startup_complete_at = self._elapsed()
+        if self.import_timer is not None:
+            self.import_timer.uninstall()
+
+    def mark_first_request(self) -> bool:
+        """Record the first completed request; returns True only for that one"""
+        if self.first_request_at is not None:
+            return False
+        self.first_request_at = self._elapsed()
+        return True
+
+    def record_lazy_import(self, name: str, seconds: float):
+        self.lazy_imports[name] = seconds
+
+    def slowest_imports(self, limit: int = 15) -> List[Dict[str, Any]]:
+        if self.import_timer is None:
+            return []
+        ranked = sorted(self.import_timer.timings.items(), key=lambda item: item[1], reverse=True)
+        return [{"module": name, "seconds": round(seconds, 4)} for name, seconds in ranked[:limit]]
+
+    def as_dict(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 4) if value is not None else None
+        return {
+            "import_seconds": rounded(self.imported_at),
+            "startup_complete_seconds": rounded(self.startup_complete_at),
+            "first_request_seconds": rounded(self.first_request_at),
+            "slowest_imports": self.slowest_imports(),
+            "lazy_imports": {name: round(seconds, 4) for name, seconds in self.lazy_imports.items()}
+        }
+
+    def summary(self) -> str:
+        parts = [f"imports {self.imported_at:.3f}s"]
+        if self.startup_complete_at is not None:
+            parts.append(f"ready {self.startup_complete_at:.3f}s")
+        if self.first_request_at is not None:
+            parts.append(f"first request {self.first_request_at:.3f}s")
+        slowest = ", ".join(f"{item['module']} {item['seconds']:.3f}s" for item in self.slowest_imports(5))
+        if slowest:
+            parts.append(f"slowest imports: {slowest}")
+        return "; ".join(parts)
+
+startup_report = StartupReport(STARTED)
+
+if os.environ.get('STARTUP_IMPORT_PROFILE', 'false').lower() == 'true':
+    startup_report.import_timer = ImportTimer()
+    startup_report.import_timer.install()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Load-testing Benchmarks for Snatched Beauties
+Drives the BeautyAPITester scenarios concurrently against an in-process app backed by
+an in-memory MongoDB stand-in and a fake Stripe, and reports latency percentiles per route.
+
+    python backend_bench.py --requests 500 --concurrency 50
+    python backend_bench.py --save-baseline bench_baseline.json
+    python backend_bench.py --compare bench_baseline.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from mongomock_motor import AsyncMongoMockClient
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import time; nothing connects to them during a benchmark
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "snatched_beauties_bench")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_bench")
+# Every benchmark request comes from one client address
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Measure the reconciler's concurrency rather than its Stripe rate budget
+os.environ.setdefault("RECONCILE_STRIPE_PER_MINUTE", "60000")
+os.environ.setdefault("RECONCILE_STRIPE_BURST", "100")
+
+import server  # noqa: E402
+from tests import fake_stripe  # noqa: E402
+from tests.fake_stripe import StripeCheckout as FakeStripeCheckout  # noqa: E402
+
+SERVICE_IDS = list(server.SERVICE_PACKAGES)
+
+# Every booking gets its own day so the availability engine never reports a conflict
+BOOKING_DAYS = itertools.count()
+
+
+# Scenarios (mirroring BeautyAPITester in backend_test.py)
+def lead_payload() -> Dict[str, Any]:
+    return {
+        "email": f"bench.user.{uuid.uuid4().hex[:8]}@snatchedbeauties.com",
+        "name": "Sophia Martinez",
+        "phone": "+1-555-0123"
+    }
+
+
+def booking_payload() -> Dict[str, Any]:
+    return {
+        "service_package": random.choice(SERVICE_IDS),
+        "preferred_date": (date(2030, 1, 1) + timedelta(days=next(BOOKING_DAYS))).isoformat(),
+        "preferred_time": f"{random.randint(9, 17)}:00",
+        "customer_name": "Isabella Rodriguez",
+        "customer_email": f"booking.bench.{uuid.uuid4().hex[:8]}@snatchedbeauties.com",
+        "customer_phone": "+1-555-0456",
+        "special_requests": "Please use hypoallergenic products"
+    }
+
+
+def contact_payload() -> Dict[str, Any]:
+    return {
+        "full_name": "Valentina Chen",
+        "email": f"contact.bench.{uuid.uuid4().hex[:8]}@snatchedbeauties.com",
+        "phone": "+1-555-0789",
+        "message": "I'm interested in learning more about your body sculpting services."
+    }
+
+
+def checkout_payload() -> Dict[str, Any]:
+    return {
+        "service_package": random.choice(SERVICE_IDS),
+        "customer_email": f"payment.bench.{uuid.uuid4().hex[:8]}@snatchedbeauties.com",
+        "customer_name": "Aurora Williams",
+        "success_url": "http://bench/payment/success",
+        "cancel_url": "http://bench/payment/cancel"
+    }
+
+
+@dataclass
+class Scenario:
+    route: str
+    send: Callable[["BenchmarkRunner"], Any]
+
+
+SCENARIOS = [
+    Scenario("GET /api/health", lambda r: r.client.get("/api/health")),
+    Scenario("GET /api/services", lambda r: r.client.get("/api/services")),
+    Scenario("GET /api/services/{service_id}",
+             lambda r: r.client.get(f"/api/services/{random.choice(SERVICE_IDS)}")),
+    Scenario("POST /api/leads", lambda r: r.client.post("/api/leads", json=lead_payload())),
+    Scenario("POST /api/leads (returning)",
+             lambda r: r.client.post("/api/leads", json={"email": random.choice(r.lead_emails)})),
+    Scenario("GET /api/leads", lambda r: r.client.get("/api/leads")),
+    Scenario("GET /api/leads/stats", lambda r: r.client.get("/api/leads/stats")),
+    Scenario("POST /api/bookings", lambda r: r.client.post("/api/bookings", json=booking_payload())),
+    Scenario("GET /api/bookings", lambda r: r.client.get("/api/bookings")),
+    Scenario("POST /api/contact", lambda r: r.client.post("/api/contact", json=contact_payload())),
+    Scenario("POST /api/payments/checkout",
+             lambda r: r.client.post("/api/payments/checkout", json=checkout_payload())),
+    Scenario("GET /api/payments/checkout/status/{session_id}",
+             lambda r: r.client.get(f"/api/payments/checkout/status/{random.choice(r.session_ids)}")),
+    Scenario("POST /api/webhook/stripe", lambda r: r.send_webhook()),
+    Scenario("GET /api/payments/transactions", lambda r: r.client.get("/api/payments/transactions")),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class BenchmarkRunner:
+    def __init__(self, requests: int, concurrency: int, stripe_latency: float):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.lead_emails: List[str] = []
+        self.session_ids: List[str] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        FakeStripeCheckout.latency = stripe_latency
+        # Status polls find sessions paid after a few checks, like a customer finishing checkout
+        FakeStripeCheckout.polls_until_paid = 3
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def setup(self):
+        """Point the app at the in-memory database and fake Stripe, then run its startup hooks"""
+        # startup_event creates the client through this hook, as each production worker does
+        server.create_mongo_client = AsyncMongoMockClient
+        server.stripe_provider.use(fake_stripe)
+        await server.startup_event()
+
+        transport = httpx.ASGITransport(app=server.app)
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+        # Seed data the read and polling scenarios draw from
+        for _ in range(20):
+            payload = lead_payload()
+            response = await self.client.post("/api/leads", json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"Seeding leads failed with {response.status_code}: {response.text}")
+            self.lead_emails.append(payload["email"])
+            response = await self.client.post("/api/payments/checkout", json=checkout_payload())
+            if response.status_code != 200:
+                raise RuntimeError(f"Seeding checkout sessions failed with {response.status_code}: {response.text}")
+            self.session_ids.append(response.json()["session_id"])
+
+    async def teardown(self):
+        await self.client.aclose()
+        await server.shutdown_db_client()
+
+    def send_webhook(self):
+        event = {
+            "event_type": "checkout.session.completed",
+            "event_id": f"evt_{uuid.uuid4().hex}",
+            "session_id": random.choice(self.session_ids),
+            "payment_status": "paid"
+        }
+        return self.client.post("/api/webhook/stripe", content=json.dumps(event),
+                                headers={"Stripe-Signature": "t=0,v1=bench"})
+
+    async def run_scenario(self, scenario: Scenario):
+        latencies: List[float] = []
+        errors = 0
+        remaining = iter(range(self.requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await scenario.send(self)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        self.results[scenario.route] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+        }
+
+    async def run(self, only: Optional[List[str]] = None):
+        await self.setup()
+        try:
+            for scenario in SCENARIOS:
+                if only and not any(name in scenario.route for name in only):
+                    continue
+                await self.run_scenario(scenario)
+                self.print_result(scenario.route)
+        finally:
+            await self.teardown()
+        return self.results
+
+    async def run_reconciliation(self, sessions: int) -> Dict[str, Any]:
+        """Seed pending transactions whose webhooks were lost and time reconciliation passes over them"""
+        await self.setup()
+        try:
+            created_at = datetime.now(timezone.utc) - timedelta(hours=1)
+            transactions = []
+            for index in range(sessions):
+                session_id = f"cs_test_{uuid.uuid4().hex}"
+                # Every other session is one poll away from paid; the rest stay open
+                polls = FakeStripeCheckout.polls_until_paid - 1 if index % 2 == 0 else -sessions
+                FakeStripeCheckout.add_session(session_id, amount=150.0, polls=polls)
+                transactions.append(server.PaymentTransactionCreate(
+                    service_package=random.choice(SERVICE_IDS), amount=150.0,
+                    customer_email=checkout_payload()["customer_email"], session_id=session_id,
+                    created_at=created_at, updated_at=created_at
+                ).model_dump())
+            await server.db.payment_transactions.insert_many(transactions)
+
+            runs = {}
+            for name in ("first pass", "second pass"):
+                calls_before = FakeStripeCheckout.calls["status"]
+                summary = await server.payment_reconciler.reconcile()
+                summary["stripe_calls"] = FakeStripeCheckout.calls["status"] - calls_before
+                runs[name] = summary
+                print(f"🔁 {name:<12} checked {summary['checked']:>5}  paid {summary['paid']:>5}  "
+                      f"updated {summary['updated']:>5}  failed {summary['failed']:>3}  "
+                      f"{summary['duration_seconds']:>7.3f}s  ({summary['stripe_calls']} Stripe calls)")
+            pending = await server.db.payment_transactions.count_documents({
+                "session_id": {"$in": [transaction["session_id"] for transaction in transactions]},
+                "payment_status": "pending"
+            })
+            print(f"{'✅' if pending == 0 else '❌'} {pending} seeded transactions still pending")
+            runs["still_pending"] = pending
+            return runs
+        finally:
+            await self.teardown()
+
+    def print_result(self, route: str):
+        result = self.results[route]
+        status = "✅" if result["errors"] == 0 else "❌"
+        print(f"{status} {route:<50} {result['throughput_rps']:>9.1f} req/s  "
+              f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms"
+              + (f"  ({result['errors']} errors)" if result["errors"] else ""))
+
+
+# Serialization (list endpoint payloads through the stdlib and orjson response paths)
+def sample_documents(route: str, count: int) -> Dict[str, Any]:
+    """List endpoint payload shaped like what Motor returns for that collection"""
+    if route == "GET /api/leads":
+        docs = [server.LeadResponse(coupon_code=server.generate_coupon_code(), **lead_payload()).model_dump()
+                for _ in range(count)]
+        return {"leads": docs, "total": count, "next_cursor": None}
+    if route == "GET /api/bookings":
+        docs = []
+        for _ in range(count):
+            booking_input = server.BookingCreate(**booking_payload())
+            slot = server.parse_booking_slot(booking_input.service_package, booking_input.preferred_date,
+                                             booking_input.preferred_time)
+            docs.append(server.build_booking(booking_input, slot).model_dump())
+        return {"bookings": docs, "total": count, "next_cursor": None}
+    docs = [server.PaymentTransactionCreate(
+        service_package=random.choice(SERVICE_IDS), amount=150.0, customer_email=checkout_payload()["customer_email"],
+        session_id=f"cs_test_{uuid.uuid4().hex}", metadata={"service_name": "Wood Therapy", "units": 1}
+    ).model_dump() for _ in range(count)]
+    return {"transactions": docs, "total": count, "next_cursor": None}
+
+
+def time_render(render: Callable[[], Any], rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return percentile(timings, 50) * 1000
+
+
+def benchmark_serialization(sizes: List[int], rounds: int) -> Dict[str, Dict[str, Any]]:
+    """Compare jsonable_encoder + JSONResponse with FastJSONResponse on admin list payloads"""
+    results = {}
+    for route in ("GET /api/leads", "GET /api/bookings", "GET /api/payments/transactions"):
+        for size in sizes:
+            payload = sample_documents(route, size)
+            stdlib_ms = time_render(lambda: JSONResponse(jsonable_encoder(payload)).body, rounds)
+            orjson_ms = time_render(lambda: server.FastJSONResponse(payload).body, rounds)
+            name = f"{route} ({size} docs)"
+            results[name] = {
+                "stdlib_p50_ms": round(stdlib_ms, 3),
+                "orjson_p50_ms": round(orjson_ms, 3),
+                "speedup": round(stdlib_ms / orjson_ms, 1) if orjson_ms else None
+            }
+            print(f"⚡ {name:<50} jsonable_encoder+json {stdlib_ms:>8.3f}ms  "
+                  f"orjson {orjson_ms:>7.3f}ms  x{results[name]['speedup']}")
+    return results
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Routes whose p95 latency or throughput got worse than the baseline by more than `tolerance`"""
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    regressions = []
+    for route, result in results.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Snatched Beauties API in-process")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients per route")
+    parser.add_argument("--stripe-latency", type=float, default=0.05, help="fake Stripe latency in seconds")
+    parser.add_argument("--only", nargs="*", help="run only routes containing these substrings")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="compare results against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio (default 0.2)")
+    parser.add_argument("--serialization", action="store_true",
+                        help="only compare response serialization paths on list endpoint payloads")
+    parser.add_argument("--reconcile", type=int, metavar="SESSIONS",
+                        help="only time payment reconciliation over this many pending transactions")
+    args = parser.parse_args()
+
+    if args.reconcile:
+        print(f"🏁 Reconciling {args.reconcile} pending transactions against the fake Stripe "
+              f"({args.stripe_latency * 1000:.0f}ms per call, {server.payment_reconciler.max_concurrency} concurrent)")
+        print("=" * 80)
+        runner = BenchmarkRunner(args.requests, args.concurrency, args.stripe_latency)
+        runs = asyncio.run(runner.run_reconciliation(args.reconcile))
+        if runs["still_pending"]:
+            sys.exit(1)
+        return
+
+    if args.serialization:
+        print("🏁 Comparing list endpoint serialization (p50 of 50 renders)")
+        print("=" * 80)
+        benchmark_serialization([100, 1000], rounds=50)
+        return
+
+    print("🏁 Starting Snatched Beauties Backend Benchmarks")
+    print(f"📍 {args.requests} requests per route, {args.concurrency} concurrent clients")
+    print("=" * 80)
+
+    runner = BenchmarkRunner(args.requests, args.concurrency, args.stripe_latency)
+    results = asyncio.run(runner.run(args.only))
+
+    print("=" * 80)
+    print(f"Fake Stripe calls: {FakeStripeCheckout.calls}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "results": results
+        }, indent=2))
+        print(f"💾 Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        regressions = compare_with_baseline(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n🚨 {len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"   ❌ {regression}")
+            sys.exit(1)
+        print(f"🎉 No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
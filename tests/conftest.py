@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+# server.py reads these at import time; tests never connect to them
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "snatched_beauties_test")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_suite")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import server  # noqa: E402
+from tests import fake_stripe  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """A fresh in-memory database with the app's indexes, swapped in for server.db"""
+    client = AsyncMongoMockClient()
+    previous = server.client, server.db
+    server.client, server.db = client, client[os.environ["DB_NAME"]]
+    await server.ensure_indexes()
+    # Days loaded from an earlier test's database would hide this one's claims
+    server.availability_index.days.invalidate()
+    yield server.db
+    server.client, server.db = previous
+
+
+@pytest.fixture
+def stripe(monkeypatch):
+    """The fake Stripe module, serving both checkout clients and session request models"""
+    fake_stripe.StripeCheckout.reset()
+    monkeypatch.setattr(server.stripe_provider, "_module", fake_stripe)
+    monkeypatch.setattr(server.stripe_clients, "checkout_factory", fake_stripe.StripeCheckout)
+    monkeypatch.setattr(server.stripe_clients, "_clients", server.LRUCache(server.stripe_clients.max_clients))
+    return fake_stripe.StripeCheckout
+
+
+@pytest.fixture
+async def api():
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
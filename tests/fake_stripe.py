@@ -0,0 +1,91 @@
+"""In-memory stand-in for emergentintegrations' Stripe checkout module, shared by the tests and
+backend_bench.py. Install it with server.stripe_provider.use(fake_stripe)."""
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CheckoutSessionRequest:
+    amount: float
+    currency: str
+    success_url: str
+    cancel_url: str
+    metadata: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class CheckoutSessionResponse:
+    url: str
+    session_id: str
+
+
+@dataclass
+class CheckoutStatusResponse:
+    status: str
+    payment_status: str
+    amount_total: int
+    currency: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class WebhookResponse:
+    event_type: str
+    event_id: str
+    session_id: str
+    payment_status: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+class StripeCheckout:
+    """Sessions start open and unpaid. With polls_until_paid set they are paid after that many
+    status checks; otherwise they only change through add_session. Every call waits `latency`."""
+
+    latency = 0.0
+    polls_until_paid: Optional[int] = None
+    sessions: Dict[str, Dict[str, Any]] = {}
+    calls: Dict[str, int] = {"create": 0, "status": 0, "webhook": 0}
+
+    def __init__(self, api_key: str, webhook_url: str):
+        self.api_key = api_key
+        self.webhook_url = webhook_url
+
+    @classmethod
+    def reset(cls):
+        cls.latency = 0.0
+        cls.polls_until_paid = None
+        cls.sessions.clear()
+        cls.calls.update(create=0, status=0, webhook=0)
+
+    @classmethod
+    def add_session(cls, session_id: str, amount: float = 150.0, polls: int = 0,
+                    status: str = "open", payment_status: str = "unpaid"):
+        cls.sessions[session_id] = {"amount": amount, "polls": polls, "status": status, "payment_status": payment_status}
+
+    async def create_checkout_session(self, checkout_request: CheckoutSessionRequest) -> CheckoutSessionResponse:
+        self.calls["create"] += 1
+        await asyncio.sleep(self.latency)
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        self.add_session(session_id, amount=checkout_request.amount)
+        return CheckoutSessionResponse(url=f"https://checkout.stripe.test/{session_id}", session_id=session_id)
+
+    async def get_checkout_status(self, session_id: str) -> CheckoutStatusResponse:
+        self.calls["status"] += 1
+        await asyncio.sleep(self.latency)
+        session = self.sessions[session_id]
+        session["polls"] += 1
+        if self.polls_until_paid is not None and session["status"] == "open" and session["polls"] >= self.polls_until_paid:
+            session.update(status="complete", payment_status="paid")
+        return CheckoutStatusResponse(
+            status=session["status"],
+            payment_status=session["payment_status"],
+            amount_total=int(session["amount"] * 100),
+            currency="usd"
+        )
+
+    async def handle_webhook(self, body: bytes, signature: str) -> WebhookResponse:
+        self.calls["webhook"] += 1
+        return WebhookResponse(**json.loads(body))
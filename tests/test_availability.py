@@ -0,0 +1,130 @@
+import anyio
+import pytest
+
+import server
+from server import AvailabilityIndex, DaySchedule, SlotConflictError, parse_booking_slot
+
+
+def schedule_of(*intervals):
+    schedule = DaySchedule()
+    for start, end, booking_id in intervals:
+        schedule.add(start, end, booking_id)
+    return schedule
+
+
+def test_overlaps_detects_partial_and_enclosing_intervals():
+    schedule = schedule_of((600, 660, "a"), (720, 750, "b"))
+
+    assert schedule.overlaps(630, 690)
+    assert schedule.overlaps(540, 900)
+    assert schedule.overlaps(735, 740)
+
+
+def test_overlaps_treats_touching_intervals_as_free():
+    schedule = schedule_of((600, 660, "a"))
+
+    assert not schedule.overlaps(540, 600)
+    assert not schedule.overlaps(660, 720)
+
+
+def test_overlaps_uses_the_running_max_of_earlier_ends():
+    # A long booking starting first hides behind a short one that starts later
+    schedule = schedule_of((540, 900, "long"), (600, 615, "short"))
+
+    assert schedule.overlaps(700, 730)
+
+
+def test_remove_frees_the_interval_and_keeps_the_others():
+    schedule = schedule_of((540, 900, "long"), (600, 615, "short"), (960, 990, "late"))
+
+    schedule.remove("long")
+
+    assert not schedule.overlaps(700, 730)
+    assert schedule.overlaps(605, 610)
+    assert schedule.overlaps(970, 980)
+    assert schedule.booking_ids == ["short", "late"]
+
+
+def test_remove_ignores_unknown_bookings():
+    schedule = schedule_of((600, 660, "a"))
+
+    schedule.remove("missing")
+
+    assert schedule.booking_ids == ["a"]
+
+
+def test_off_grid_start_times_are_rejected():
+    with pytest.raises(ValueError):
+        parse_booking_slot("consultation", "2030-01-01", "9:10")
+
+
+@pytest.mark.anyio
+async def test_back_to_back_bookings_do_not_conflict(db):
+    index = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES)
+
+    await index.reserve(parse_booking_slot("ultrasonic_cavitation", "2030-01-01", "9:15"), "first")
+    await index.reserve(parse_booking_slot("ultrasonic_cavitation", "2030-01-01", "10:15"), "second")
+
+    assert await db.booking_slots.count_documents({}) == 8
+
+
+@pytest.mark.anyio
+async def test_bookings_taken_on_another_worker_are_seen_once_the_day_expires(db):
+    worker_a = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES)
+    worker_b = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES, day_ttl=0.05)
+    slot = parse_booking_slot("consultation", "2030-01-01", "10:00")
+    # Worker B loads the day before worker A takes the slot
+    assert "10:00" in await worker_b.available_slots("consultation", "2030-01-01")
+
+    await worker_a.reserve(slot, "on-a")
+    await anyio.sleep(0.1)
+
+    assert "10:00" not in await worker_b.available_slots("consultation", "2030-01-01")
+    with pytest.raises(SlotConflictError):
+        await worker_b.reserve(slot, "on-b")
+
+    await worker_a.release(slot, "on-a")
+    await worker_b.reserve(slot, "on-b")
+
+
+@pytest.mark.anyio
+async def test_stale_day_still_rejects_a_slot_taken_on_another_worker(db):
+    worker_a = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES)
+    worker_b = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES, day_ttl=60)
+    slot = parse_booking_slot("consultation", "2030-01-01", "10:00")
+    assert "10:00" in await worker_b.available_slots("consultation", "2030-01-01")
+
+    await worker_a.reserve(slot, "on-a")
+
+    with pytest.raises(SlotConflictError):
+        await worker_b.reserve(slot, "on-b")
+    # The conflict reloaded the day, so B now lists the slot as taken without waiting for the TTL
+    assert "10:00" not in await worker_b.available_slots("consultation", "2030-01-01")
+    assert await db.booking_slots.count_documents({"booking_id": "on-b"}) == 0
+
+
+@pytest.mark.anyio
+async def test_loaded_days_and_locks_stay_bounded(db):
+    index = AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES, max_days=3)
+
+    for day in range(1, 11):
+        await index.available_slots("consultation", f"2030-01-{day:02d}")
+
+    assert len(index.days._entries) == 3
+    assert index._locks == {}
+
+
+@pytest.mark.parametrize("preferred_date,preferred_time", [
+    ("2030-01-01", "8:45"),
+    ("2030-01-01", "19:45"),
+    ("2020-01-01", "10:00"),
+])
+def test_bookings_outside_opening_hours_or_in_the_past_are_rejected(preferred_date, preferred_time):
+    with pytest.raises(ValueError):
+        parse_booking_slot("consultation", preferred_date, preferred_time)
+
+
+def test_existing_bookings_are_parsed_without_the_new_booking_rules():
+    slot = parse_booking_slot("consultation", "2020-01-01", "8:10", new_booking=False)
+
+    assert slot == {"date": "2020-01-01", "start": 490, "end": 490 + server.SERVICE_PACKAGES["consultation"]["duration"]}
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+import server
+
+
+def booking_line(day: int, time: str = "10:00") -> bytes:
+    return json.dumps({
+        "service_package": "consultation", "preferred_date": f"2030-01-{day:02d}", "preferred_time": time,
+        "customer_name": "Ana", "customer_email": "ana@example.com", "customer_phone": "555-0100"
+    }).encode() + b"\n"
+
+
+async def post_ndjson(chunks, disconnect: bool = False):
+    """Drive the batch endpoint over raw ASGI so the upload can drop partway through"""
+    remaining = list(chunks)
+
+    async def receive():
+        if remaining:
+            return {"type": "http.request", "body": remaining.pop(0), "more_body": bool(remaining) or disconnect}
+        return {"type": "http.disconnect"}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/bookings/batch", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/x-ndjson")], "client": ("203.0.113.7", 5000),
+        "server": ("test", 80), "scheme": "http", "http_version": "1.1"
+    }
+    await server.app(scope, receive, send)
+    return messages
+
+
+@pytest.mark.anyio
+async def test_dropped_upload_releases_its_slot_claims(db):
+    with pytest.raises(ClientDisconnect):
+        await post_ndjson([booking_line(day) for day in (1, 2, 3)], disconnect=True)
+
+    assert await db.bookings.count_documents({}) == 0
+    assert await db.booking_slots.count_documents({}) == 0
+
+
+@pytest.mark.anyio
+async def test_upload_cancelled_after_claiming_releases_its_slot_claims(db, monkeypatch):
+    collection_type = type(db.bookings)
+    insert_many = collection_type.insert_many
+
+    def cancelled_insert_many(self, documents, *args, **kwargs):
+        if self.name == "bookings":
+            raise asyncio.CancelledError()
+        return insert_many(self, documents, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", cancelled_insert_many)
+
+    with pytest.raises(asyncio.CancelledError):
+        await post_ndjson([booking_line(day) for day in (1, 2, 3)])
+
+    assert await db.booking_slots.count_documents({}) == 0
+
+
+@pytest.mark.anyio
+async def test_overlong_ndjson_line_is_rejected(db, api):
+    response = await api.post("/api/bookings/batch", content=b"x" * (server.BOOKING_BATCH_MAX_LINE_BYTES + 1),
+                              headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 413
+
+
+def booking_item(day: int, time: str) -> dict:
+    return json.loads(booking_line(day, time))
+
+
+@pytest.fixture
+def slot_inserts(db, monkeypatch):
+    """Records the size of every insert_many into booking_slots"""
+    sizes = []
+    collection_type = type(db.booking_slots)
+    insert_many = collection_type.insert_many
+
+    def recording_insert_many(self, documents, *args, **kwargs):
+        if self.name == "booking_slots":
+            documents = list(documents)
+            sizes.append(len(documents))
+        return insert_many(self, documents, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", recording_insert_many)
+    return sizes
+
+
+@pytest.mark.anyio
+async def test_batch_claims_a_chunk_with_one_insert(db, api, slot_inserts):
+    other_worker = server.AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES)
+    await other_worker.reserve(server.parse_booking_slot("consultation", "2030-01-02", "12:00"), "elsewhere")
+    slot_inserts.clear()
+    items = [
+        booking_item(1, "10:00"),
+        booking_item(1, "10:15"),  # overlaps the item before it
+        booking_item(1, "11:00"),
+        booking_item(2, "12:00"),  # taken on another worker
+        booking_item(2, "13:00"),
+    ]
+
+    response = await api.post("/api/bookings/batch", json=items)
+
+    assert [result["status"] for result in response.json()["results"]] == [
+        "created", "conflict", "created", "conflict", "created"
+    ]
+    assert slot_inserts == [6]
+    assert await db.bookings.count_documents({}) == 3
+
+
+@pytest.mark.anyio
+async def test_claims_lost_to_another_worker_map_back_to_their_items(db, api):
+    # This worker loads the day, then another worker takes 10:00 before the batch arrives
+    assert "10:00" in await server.availability_index.available_slots("consultation", "2030-01-01")
+    other_worker = server.AvailabilityIndex(540, 1200, server.SLOT_INTERVAL_MINUTES)
+    await other_worker.reserve(server.parse_booking_slot("consultation", "2030-01-01", "10:00"), "elsewhere")
+
+    response = await api.post("/api/bookings/batch", json=[booking_item(1, "11:00"), booking_item(1, "10:00")])
+
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["created", "conflict"]
+    claims = await db.booking_slots.find({}, {"_id": 0, "booking_id": 1}).to_list(None)
+    assert sorted({claim["booking_id"] for claim in claims}) == sorted(["elsewhere", results[0]["booking_id"]])
+    assert "10:00" not in await server.availability_index.available_slots("consultation", "2030-01-01")
@@ -0,0 +1,15 @@
+import pytest
+
+import server
+
+
+@pytest.mark.anyio
+async def test_issued_codes_are_seeded_once(db):
+    await db.leads.insert_many([{"id": f"lead-{number}", "email": f"lead{number}@example.com", "coupon_code": f"SNATCH-{number:06d}"} for number in range(3)])
+
+    assert await server.coupon_allocator.seed_issued_codes() == 3
+    await db.leads.insert_one({"id": "lead-late", "email": "late@example.com", "coupon_code": "SNATCH-999999"})
+
+    # The marker skips the scan on every later start
+    assert await server.coupon_allocator.seed_issued_codes() == 0
+    assert await db.coupon_codes.count_documents({}) == 3
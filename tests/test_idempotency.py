@@ -0,0 +1,75 @@
+import anyio
+import pytest
+from fastapi import HTTPException
+
+import server
+
+CHECKOUT = {"service_package": "wood_therapy", "customer_email": "ana@example.com", "customer_name": "Ana"}
+
+
+@pytest.mark.anyio
+async def test_repeated_idempotency_key_replays_the_first_checkout(db, stripe, api):
+    headers = {"Idempotency-Key": "checkout-replay"}
+
+    first = await api.post("/api/payments/checkout", json=CHECKOUT, headers=headers)
+    second = await api.post("/api/payments/checkout", json=CHECKOUT, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert stripe.calls["create"] == 1
+    assert await db.payment_transactions.count_documents({}) == 1
+
+
+@pytest.mark.anyio
+async def test_idempotency_key_reused_with_another_body_is_rejected(db, stripe, api):
+    headers = {"Idempotency-Key": "checkout-mismatch"}
+    await api.post("/api/payments/checkout", json=CHECKOUT, headers=headers)
+
+    response = await api.post("/api/payments/checkout", json={**CHECKOUT, "service_package": "ems_muscle_stimulation"},
+                              headers=headers)
+
+    assert response.status_code == 422
+    assert stripe.calls["create"] == 1
+
+
+@pytest.mark.anyio
+async def test_stored_idempotency_key_is_replayed_by_another_worker(db, stripe, api, monkeypatch):
+    headers = {"Idempotency-Key": "checkout-other-worker"}
+    first = await api.post("/api/payments/checkout", json=CHECKOUT, headers=headers)
+    # A fresh store has no local cache, as in a second worker process
+    monkeypatch.setattr(server.idempotency_store, "_completed", server.LRUCache(16))
+
+    second = await api.post("/api/payments/checkout", json=CHECKOUT, headers=headers)
+
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert stripe.calls["create"] == 1
+
+
+@pytest.mark.anyio
+async def test_lock_is_renewed_while_a_slow_request_runs(db):
+    worker_a = server.IdempotencyStore(ttl_seconds=3600, lock_seconds=0.3, cache_size=16)
+    worker_b = server.IdempotencyStore(ttl_seconds=3600, lock_seconds=0.3, cache_size=16)
+    calls = []
+
+    async def slow_checkout():
+        calls.append("checkout")
+        await anyio.sleep(1)
+        return {"session_id": "cs_slow"}
+
+    async def duplicate_after_the_lock_would_have_lapsed():
+        await anyio.sleep(0.6)
+        with pytest.raises(HTTPException) as error:
+            await worker_b.run("slow-key", "fingerprint", slow_checkout)
+        assert error.value.status_code == 409
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(duplicate_after_the_lock_would_have_lapsed)
+        response, replayed = await worker_a.run("slow-key", "fingerprint", slow_checkout)
+
+    assert (response, replayed) == ({"session_id": "cs_slow"}, False)
+    assert calls == ["checkout"]
+    assert (await db.idempotency_keys.find_one({"_id": "slow-key"}))["status"] == "completed"
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_datetimes_and_ids():
+    created_at = datetime(2030, 1, 1, 9, 30, 15, 123000, tzinfo=timezone.utc)
+
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": "lead-7"}, "created_at")) == (created_at, "lead-7")
+
+
+def test_cursor_round_trips_plain_values():
+    assert decode_cursor(encode_cursor({"timestamp": "2030-01-01", "id": "a"}, "timestamp")) == ("2030-01-01", "a")
+
+
+@pytest.mark.anyio
+async def test_invalid_cursor_is_a_400(db, api):
+    response = await api.get("/api/leads", params={"after": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_pages_cover_every_lead_once_newest_first(db, api):
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    # Pairs of leads share a created_at, so pages must break ties on id
+    leads = [
+        {"id": f"lead-{number:02d}", "email": f"lead{number}@example.com", "coupon_code": f"SNATCH-{number:06d}",
+         "created_at": base + timedelta(minutes=number // 2)}
+        for number in range(7)
+    ]
+    await db.leads.insert_many(leads)
+
+    seen, after = [], None
+    while True:
+        params = {"limit": 2, **({"after": after} if after else {})}
+        page = (await api.get("/api/leads", params=params)).json()
+        seen.extend(lead["id"] for lead in page["leads"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    expected = [lead["id"] for lead in sorted(leads, key=lambda lead: (lead["created_at"], lead["id"]), reverse=True)]
+    assert seen == expected
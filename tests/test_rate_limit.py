@@ -0,0 +1,50 @@
+import pytest
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+import server
+
+PROXY = "10.0.0.1"
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def post_contact(app, peer: str, forwarded_for: str) -> int:
+    """Status of one POST /api/contact arriving from `peer` with the given X-Forwarded-For"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/contact", "query_string": b"", "root_path": "",
+        "headers": [(b"x-forwarded-for", forwarded_for.encode())], "client": (peer, 5000),
+        "server": ("test", 80), "scheme": "http", "http_version": "1.1"
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+@pytest.fixture
+def app():
+    limiter = server.RateLimiter({("POST", "/api/contact"): (1, 1)}, server.InMemoryRateLimitBackend(100))
+    # Stacked the way uvicorn runs the app with proxy_headers and FORWARDED_ALLOW_IPS
+    return ProxyHeadersMiddleware(server.RateLimitMiddleware(ok_app, limiter=limiter), trusted_hosts=PROXY)
+
+
+@pytest.mark.anyio
+async def test_clients_behind_a_trusted_proxy_get_their_own_buckets(app):
+    assert await post_contact(app, PROXY, "203.0.113.1") == 200
+    assert await post_contact(app, PROXY, "203.0.113.1") == 429
+    assert await post_contact(app, PROXY, "203.0.113.2") == 200
+
+
+@pytest.mark.anyio
+async def test_forwarded_for_from_an_untrusted_peer_is_ignored(app):
+    assert await post_contact(app, "198.51.100.7", "203.0.113.1") == 200
+    assert await post_contact(app, "198.51.100.7", "203.0.113.2") == 429
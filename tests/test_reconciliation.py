@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server import PaymentReconciler, PaymentTransactionCreate
+
+
+def reconciler():
+    return PaymentReconciler(interval=300, min_age=600, max_age=48 * 3600, max_sessions=100,
+                             max_concurrency=4, per_minute=6000, burst=100, base_url="http://test")
+
+
+async def seed_transaction(db, session_id, age=timedelta(hours=1), payment_status="pending"):
+    created_at = datetime.now(timezone.utc) - age
+    await db.payment_transactions.insert_one(PaymentTransactionCreate(
+        service_package="wood_therapy", amount=130.0, customer_email="ana@example.com", session_id=session_id,
+        payment_status=payment_status, created_at=created_at, updated_at=created_at
+    ).model_dump())
+
+
+@pytest.mark.anyio
+async def test_reconcile_settles_transactions_whose_webhook_was_missed(db, stripe):
+    stripe.add_session("cs_paid", status="complete", payment_status="paid")
+    stripe.add_session("cs_open", status="open", payment_status="unpaid")
+    stripe.add_session("cs_expired", status="expired", payment_status="unpaid")
+    for session_id in stripe.sessions:
+        await seed_transaction(db, session_id)
+
+    summary = await reconciler().reconcile()
+
+    assert summary["checked"] == 3
+    assert summary["failed"] == 0
+    assert summary["paid"] == 1
+    assert summary["updated"] == 3
+    statuses = {transaction["session_id"]: transaction async for transaction in db.payment_transactions.find()}
+    assert statuses["cs_paid"]["payment_status"] == "paid"
+    assert statuses["cs_paid"]["checkout_status"]["status"] == "complete"
+    assert statuses["cs_open"]["payment_status"] == "unpaid"
+    assert "checkout_status" not in statuses["cs_open"]
+    assert statuses["cs_expired"]["checkout_status"]["status"] == "expired"
+
+
+@pytest.mark.anyio
+async def test_reconcile_only_rechecks_sessions_still_open(db, stripe):
+    stripe.add_session("cs_paid", status="complete", payment_status="paid")
+    stripe.add_session("cs_open", status="open", payment_status="unpaid")
+    for session_id in stripe.sessions:
+        await seed_transaction(db, session_id)
+    job = reconciler()
+    await job.reconcile()
+    calls_before = stripe.calls["status"]
+
+    summary = await job.reconcile()
+
+    assert summary["checked"] == 1
+    assert summary["updated"] == 0
+    assert stripe.calls["status"] - calls_before == 1
+
+
+@pytest.mark.anyio
+async def test_reconcile_skips_transactions_outside_the_age_window(db, stripe):
+    stripe.add_session("cs_recent", status="complete", payment_status="paid")
+    stripe.add_session("cs_stale", status="complete", payment_status="paid")
+    await seed_transaction(db, "cs_recent", age=timedelta(minutes=1))
+    await seed_transaction(db, "cs_stale", age=timedelta(days=3))
+
+    summary = await reconciler().reconcile()
+
+    assert summary["checked"] == 0
+    assert stripe.calls["status"] == 0
+
+
+@pytest.mark.anyio
+async def test_reconcile_counts_failed_stripe_checks(db, stripe):
+    # No fake session exists for this id, so the status call raises
+    await seed_transaction(db, "cs_unknown")
+
+    summary = await reconciler().reconcile()
+
+    assert summary["checked"] == 0
+    assert summary["failed"] == 1
+    transaction = await db.payment_transactions.find_one({"session_id": "cs_unknown"})
+    assert transaction["payment_status"] == "pending"
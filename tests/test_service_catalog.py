@@ -0,0 +1,47 @@
+import pytest
+
+import server
+
+CATALOG = [
+    {"service_id": "lymphatic_drainage", "name": "Lymphatic Drainage", "price": 120.0, "duration": "60 minutes",
+     "description": "Manual lymphatic drainage"},
+    {"service_id": "wood_therapy", "name": "Wood Therapy", "price": 95.0, "duration": "45 minutes",
+     "description": "Maderotherapy sculpting"},
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """Restores the module's catalog globals and gives this worker a fresh sync state"""
+    monkeypatch.setattr(server, "service_catalog", server.service_catalog)
+    monkeypatch.setattr(server, "SERVICE_PACKAGES", server.SERVICE_PACKAGES)
+    monkeypatch.setattr(server, "catalog_sync", server.CatalogSync(poll_interval=60))
+
+
+@pytest.mark.anyio
+async def test_reload_is_picked_up_by_other_workers(db, api, catalog):
+    await db.service_catalog.insert_many([dict(service) for service in CATALOG])
+    original = server.service_catalog
+
+    response = await api.post("/api/services/reload", params={"source": "collection"})
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    reloaded = server.service_catalog
+    assert reloaded.packages["wood_therapy"]["price"] == 95.0
+
+    # A second worker still serving the startup catalog converges on the published version
+    server.service_catalog, server.SERVICE_PACKAGES = original, original.packages
+    other_worker = server.CatalogSync(poll_interval=60)
+    assert await other_worker.sync() is True
+    assert server.service_catalog.listing == reloaded.listing
+    assert server.SERVICE_PACKAGES["lymphatic_drainage"]["price"] == 120.0
+    assert await other_worker.sync() is False
+
+
+@pytest.mark.anyio
+async def test_failed_reload_publishes_nothing(db, api, catalog):
+    response = await api.post("/api/services/reload", params={"source": "collection"})
+
+    assert response.status_code == 400
+    assert await db.catalog_state.count_documents({}) == 0
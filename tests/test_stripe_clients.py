@@ -0,0 +1,28 @@
+import pytest
+
+import server
+
+
+@pytest.mark.anyio
+async def test_public_base_url_keys_clients_regardless_of_host(stripe, api, monkeypatch):
+    monkeypatch.setattr(server, "PUBLIC_BASE_URL", "https://snatched.example")
+
+    for host in ("evil-1.example", "evil-2.example", "evil-3.example"):
+        # The empty event is rejected, but only after the client has been resolved
+        await api.post("/api/webhook/stripe", content=b"{}", headers={"Host": host, "Stripe-Signature": "t=1"})
+
+    assert list(server.stripe_clients._clients._entries) == ["https://snatched.example/api/webhook/stripe"]
+
+
+def test_registry_evicts_least_recently_used_clients(stripe, monkeypatch):
+    monkeypatch.setattr(server.stripe_clients, "_clients", server.LRUCache(2))
+
+    first = server.get_stripe_checkout("http://a.example")
+    server.get_stripe_checkout("http://b.example")
+    server.get_stripe_checkout("http://a.example")
+    server.get_stripe_checkout("http://c.example")
+
+    assert list(server.stripe_clients._clients._entries) == [
+        "http://a.example/api/webhook/stripe", "http://c.example/api/webhook/stripe"
+    ]
+    assert server.get_stripe_checkout("http://a.example") is first
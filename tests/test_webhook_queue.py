@@ -0,0 +1,87 @@
+import json
+
+import anyio
+import pytest
+
+import server
+from tests import fake_stripe
+
+
+def queue(claim_seconds: float = 60):
+    return server.WebhookQueue(batch_size=10, poll_interval=5, claim_seconds=claim_seconds)
+
+
+def event(number: int) -> fake_stripe.WebhookResponse:
+    return fake_stripe.WebhookResponse(event_type="checkout.session.completed", event_id=f"evt_{number}",
+                                       session_id=f"cs_{number}", payment_status="paid")
+
+
+async def enqueue_events(db, worker, count: int):
+    await db.payment_transactions.insert_many([
+        {"id": f"txn_{number}", "session_id": f"cs_{number}", "payment_status": "pending"} for number in range(count)
+    ])
+    for number in range(count):
+        await worker.enqueue(event(number), json.dumps({"id": f"evt_{number}"}).encode())
+
+
+@pytest.mark.anyio
+async def test_two_workers_apply_each_event_once(db, monkeypatch):
+    applied = []
+    collection_type = type(db.webhook_events)
+    update_many = collection_type.update_many
+
+    async def contended_update_many(self, *args, **kwargs):
+        # Yield first so the other worker reads the same candidates before either claims them
+        await anyio.sleep(0)
+        return await update_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "update_many", contended_update_many)
+
+    class RecordingQueue(server.WebhookQueue):
+        async def claim_batch(self):
+            events = await super().claim_batch()
+            applied.extend(event["event_id"] for event in events)
+            return events
+
+    workers = [RecordingQueue(batch_size=10, poll_interval=5, claim_seconds=60) for _ in range(2)]
+    await enqueue_events(db, workers[0], 25)
+
+    # Both workers race for the same oldest events on every round until the queue is drained
+    while await db.webhook_events.count_documents({"processed": False}):
+        async with anyio.create_task_group() as tasks:
+            for worker in workers:
+                tasks.start_soon(worker.process_batch)
+
+    assert sorted(applied) == sorted(f"evt_{number}" for number in range(25))
+    assert sum(worker.processed_total for worker in workers) == 25
+    assert await db.payment_transactions.count_documents({"payment_status": "paid"}) == 25
+
+
+@pytest.mark.anyio
+async def test_expired_claim_is_picked_up_by_another_worker(db):
+    crashed, survivor = queue(claim_seconds=0.05), queue()
+    await enqueue_events(db, crashed, 3)
+
+    # The first worker claims the events and dies before applying them
+    assert len(await crashed.claim_batch()) == 3
+    assert await survivor.process_batch() == 0
+
+    await anyio.sleep(0.1)
+
+    assert await survivor.process_batch() == 3
+    assert await db.webhook_events.count_documents({"processed": False}) == 0
+    assert await db.payment_transactions.count_documents({"payment_status": "paid"}) == 3
+
+
+@pytest.mark.anyio
+async def test_redelivered_event_is_queued_once(db, stripe, api):
+    body = json.dumps({"event_type": "checkout.session.completed", "event_id": "evt_redelivered",
+                       "session_id": "cs_redelivered", "payment_status": "paid"})
+    duplicates_before = server.webhook_queue.duplicates_total
+
+    for _ in range(2):
+        response = await api.post("/api/webhook/stripe", content=body, headers={"Stripe-Signature": "t=1"})
+        assert response.status_code == 200
+
+    assert await db.webhook_events.count_documents({"event_id": "evt_redelivered"}) == 1
+    assert server.webhook_queue.duplicates_total == duplicates_before + 1
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from server import WriteBehindBuffer
+
+
+@pytest.mark.anyio
+async def test_stop_lets_an_in_progress_flush_finish(db, monkeypatch):
+    collection_type = type(db.contact_forms)
+    insert_many = collection_type.insert_many
+
+    async def slow_insert_many(self, docs, **kwargs):
+        await asyncio.sleep(0.2)
+        return await insert_many(self, docs, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", slow_insert_many)
+    buffer = WriteBehindBuffer("contact_forms", enabled=True, batch_size=2, flush_interval=0.01, max_pending=100)
+    buffer.start()
+    for number in range(3):
+        await buffer.insert({"number": number})
+    # Let the loop start writing the first batch, then shut down underneath it
+    await asyncio.sleep(0.05)
+
+    await buffer.stop()
+
+    assert await db.contact_forms.count_documents({}) == 3
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_flush_requeues_its_batch(db, monkeypatch):
+    collection_type = type(db.contact_forms)
+
+    async def hanging_insert_many(self, docs, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(collection_type, "insert_many", hanging_insert_many)
+    buffer = WriteBehindBuffer("contact_forms", enabled=True, batch_size=10, flush_interval=1, max_pending=100)
+    buffer._pending.extend({"number": number} for number in range(3))
+    flush = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0.01)
+
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    assert buffer.stats()["pending"] == 3